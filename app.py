@@ -1,188 +1,163 @@
-import json
 import logging
-import os
-from dotenv import load_dotenv
+import time
 import streamlit as st
-from io import StringIO
-from groq import Groq
-from openai.lib.azure import AzureOpenAI
+from batch_protocol import PROTOCOLS, get_protocol
+from glossary import Glossary, default_glossary_text
+from path_rules import PathRules
+import translator
+from jobs import FAILED, QUEUED, get_job_manager
+from translator import max_concurrency, translation_memory
 
 # 配置日志
 logging.basicConfig(format='[%(asctime)s %(filename)s:%(lineno)d] %(levelname)s: %(message)s', level=logging.INFO, force=True)
 
-load_dotenv(override=True)
-
-provider = os.environ.get("LLM_PROVIDER")
-if provider == "azure":
-    client = AzureOpenAI(
-        api_key=os.environ['AZURE_OPENAI_GPT4oMINI_API_KEY'],
-        api_version=os.environ['OPENAI_API_GPT4oMINI_VERSION'],
-        azure_endpoint=os.environ['AZURE_OPENAI_GPT4oMINI_ENDPOINT']
-    )
-    model = os.environ['OPENAI_GPT4OMIN_DEPLOYMENT_NAME']
-elif provider == "openai":
-    from openai import OpenAI
-    client = OpenAI(api_key=os.environ.get("OPENAI_API_KEY"))
-    model = "gpt-4o-mini"
-else:
-    client = Groq(api_key=os.environ.get("GROQ_API_KEY"), )
-    model = "llama-3.1-70b-versatile"
-
-sys_prompt = """将所给的文本中的中文，翻译成英文。
-    注意：1）文本中的‘票’，默认是指‘发票’ 
-    2）红票或红字发票: credit invoice 
-    3）蓝票或蓝字发票: invoice 
-    4）开票项: invoicing item
-    5）数电票: fully digitized e-invoice
-    6）专票或增值税专用发票: Special VAT Invoice
-    7）普票或增值税普通发票: Normal VAT Invoice
-    输出要求：1）不要改动输入文本的任何格式和符号 2）只返回翻译结果，不要包含其他内容 3)请保留原始文本中的段落结构"""
-
-
-# 批量翻译函数，按文本列表的 item 数量分批处理
-def translate_text(text_list, batch_size=30, log_placeholder=None):
-    translated_texts = []
-
-    split_tag = '\n🚀'
-    # 分批处理，确保每批不超过 batch_size
-    for i in range(0, len(text_list), batch_size):
-        if log_placeholder:
-            log_placeholder.markdown(f"翻译进度: {i} / {len(text_list)}")
-
-        batch = text_list[i:i + batch_size]  # 切分成每 batch_size 个文本的子列表
-
-        combined_text = split_tag.join(batch)
-        completion = client.chat.completions.create(
-            model=model,
-            messages=[{"role": "system", "content": sys_prompt}, {"role": "user", "content": combined_text}],
-            temperature=0,
-        )
-
-        # 分割翻译结果并添加到列表
-        translated_batch = completion.choices[0].message.content.split(split_tag)
-
-        print(f"[中文 {len(batch)} \n{batch}\n")
-        print(f"[英文]: {len(translated_batch)} \n{translated_batch}\n")
-        if len(batch) != len(translated_batch):
-            if log_placeholder:
-                log_placeholder.warning(f"==========错误===============\n"
-                f"[中文]: {len(batch)} \n{combined_text} \n "
-                f"[英文]: {len(translated_batch)} \n{translated_batch} {completion.choices[0].message.content} \n ")
-
-            translated_texts.extend(batch)
-        else:
-            translated_texts.extend(translated_batch)
-
-    return translated_texts
-
-
-# 递归遍历 JSON，批量收集需要翻译的文本
-def collect_translations(data, translations, translated_data, log_placeholder=None):
-    translated_data = data
-    if isinstance(data, dict):
-        for key, value in data.items():
-            translated_data[key] = collect_translations(value, translations, {}, log_placeholder)
-    elif isinstance(data, list):
-        translated_data = []
-        for item in data:
-            translated_data.append(collect_translations(item, translations, {}, log_placeholder))
-    elif isinstance(data, str):
-        if any('\u4e00' <= char <= '\u9fff' for char in data):
-            translations.append(data)  # 收集中文文本进行批量翻译
-            translated_data = data
-        else:
-            translated_data = data
-    return translated_data
-
-
-# 递归替换 JSON 中的中文内容
-def replace_translations(data, translated_texts, index=0):
-    if isinstance(data, dict):
-        for key, value in data.items():
-            data[key], index = replace_translations(value, translated_texts, index)
-    elif isinstance(data, list):
-        for i in range(len(data)):
-            data[i], index = replace_translations(data[i], translated_texts, index)
-    elif isinstance(data, str):
-        if any('\u4e00' <= char <= '\u9fff' for char in data):
-            data = translated_texts[index]
-            index += 1
-    return data, index
-
-
-# 读取JSON文件
-def load_json(json_file):
-    stringio = StringIO(json_file.getvalue().decode("utf-8"))
-    return json.load(stringio)
-
-
-# 保存翻译后的JSON文件为StringIO对象以便下载
-def save_json_to_stringio(data):
-    with open("output.json", 'w', encoding='utf-8') as f:
-        json.dump(data, f, ensure_ascii=False, indent=4)
-    json_str = json.dumps(data, ensure_ascii=False, indent=4)
-    return json_str
-
-
-# 主函数：加载原始 JSON -> 翻译 -> 返回翻译后的文件
-def translate_and_save_json(json_file, log_placeholder):
-    # 加载原始 JSON 文件
-    original_data = load_json(json_file)
-
-    # 收集所有需要翻译的文本
-    translations = []
-    translated_data = collect_translations(original_data, translations, {}, log_placeholder)
-
-    # 批量翻译
-    if translations:
-        translated_texts = translate_text(translations, log_placeholder=log_placeholder)
-
-        log_placeholder.markdown(f"已翻译的条目: {len(translations)}", unsafe_allow_html=True)
-        logging.info(f"Translated Entries: {len(translations)}")
-
-        # 替换 JSON 中的翻译内容
-        translated_data, _ = replace_translations(translated_data, translated_texts)
-
-    # 将翻译后的数据转换为 StringIO 对象
-    return save_json_to_stringio(translated_data)
+# 后台任务进行中时页面刷新进度的间隔（秒）
+POLL_INTERVAL = 1.0
 
 
 # Streamlit界面
 def main():
-    global sys_prompt  # 声明使用全局变量
-
     st.title("JSON Translator")
-    st.write("上传一个包含中文的JSON文件，系统将其中文部分翻译为英文。")
-
-    # 用户可以编辑sys_prompt的部分
-    sys_prompt = st.text_area("提示词（可在此维护自定义术语）", sys_prompt, height=300)
+    st.write("上传一个包含中文的JSON文件，系统将其中文部分翻译为所选的目标语言（默认英文）。")
+
+    # 目标语言：选择多种语言时在同一个任务中只收集和去重一次，各语言并发翻译，结果为每种语言一个 JSON 的 zip 包
+    languages = st.multiselect("目标语言", list(translator.TARGET_LANGUAGES), default=["en"],
+                               format_func=translator.TARGET_LANGUAGES.get)
+    if not languages:
+        st.warning("请至少选择一种目标语言")
+        st.stop()
+    multilingual = len(languages) > 1
+
+    # 用户可以编辑sys_prompt的部分；编辑结果只作用于当前会话。提示词和术语表只用于英文
+    sys_prompt = st.text_area("提示词（英文，可在此维护自定义术语）", translator.sys_prompt, height=300)
+
+    # 提示词变化后缓存键随之变化，旧提示词下的译文不会再命中；也可以手动清除
+    if st.session_state.get("last_sys_prompt") not in (None, sys_prompt):
+        st.info("提示词已修改，将不再使用旧提示词下的翻译缓存")
+    st.session_state["last_sys_prompt"] = sys_prompt
+    if st.button("清除当前提示词的翻译缓存"):
+        removed = translation_memory.invalidate(sys_prompt)
+        st.write(f"已清除 {removed} 条缓存")
+
+    # 结构化术语表：完全由术语组成的文本（例如枚举值、标签）直接在本地翻译，不经过模型，保证术语一致
+    glossary_text = st.text_area("术语表（每行：中文 = 英文）", default_glossary_text(), height=200)
+    try:
+        glossary = Glossary.from_text(glossary_text)
+    except ValueError as e:
+        st.error(f"术语表格式错误: {e}")
+        st.stop()
+
+    # 路径规则：排除内部 ID、正则、示例数据等不面向用户的字段，或只翻译指定字段；被排除的子树不会被遍历
+    with st.expander("路径规则（可选）"):
+        include_text = st.text_area("只翻译这些路径（每行一条，留空表示全部）", placeholder="$.paths.*.*.summary\ndescription")
+        exclude_text = st.text_area("不翻译这些路径（每行一条）", placeholder="$..examples\npattern\nx-*")
+    try:
+        rules = PathRules.from_text(include_text, exclude_text)
+    except ValueError as e:
+        st.error(f"路径规则格式错误: {e}")
+        st.stop()
+
+    # 同时发送的翻译请求数
+    concurrency = st.number_input("并发请求数", min_value=1, max_value=32, value=max_concurrency)
+
+    # 批量请求的格式：分隔符协议，或带编号的 JSON 协议（按编号对应结果，部分失败时只重试失败的条目）
+    protocol = get_protocol(st.selectbox("批量请求格式", list(PROTOCOLS),
+                                         index=list(PROTOCOLS).index(get_protocol().name),
+                                         format_func={"split_tag": "分隔符", "json": "JSON（带编号）"}.get))
+
+    # 超大文件使用流式模式，内存占用不随文件大小增长；输出保留原文件的缩进格式
+    streaming = st.checkbox("流式处理（适用于超大文件）", disabled=multilingual) and not multilingual
+
+    # 输出格式：4 空格缩进，或不含空白的紧凑格式（文件更小、生成更快）；流式处理时保留原文件格式
+    indent = st.radio("输出格式", [4, None], format_func={4: "缩进", None: "紧凑"}.get, horizontal=True,
+                      disabled=streaming)
 
     # 上传文件的部分
     uploaded_file = st.file_uploader("选择一个JSON文件", type="json")
 
-    # 如果有上传文件，开始处理
+    # 增量翻译：提供上一版的原文和译文后，只翻译新增或改动的文本，其余沿用上一版译文
+    with st.expander("增量翻译（可选）"):
+        previous_source = st.file_uploader("上一版原文", type="json", key="previous_source")
+        previous_translated = st.file_uploader("上一版译文", type="json", key="previous_translated")
+    previous_files = (previous_source, previous_translated) if previous_source and previous_translated else None
+    if streaming and previous_files:
+        st.warning("流式处理不支持增量翻译，将翻译全部文本")
+    if streaming and rules:
+        st.warning("流式处理不支持路径规则，将翻译全部文本")
+    if multilingual and previous_files:
+        st.warning("同时翻译多种语言时不支持增量翻译，将翻译全部文本")
+
+    # 如果有上传文件，提交后台任务；相同的文件和设置只翻译一次，页面重跑或多人同时上传都共用同一个任务
     if uploaded_file is not None:
         # 显示文件名
         st.write(f"已上传文件: {uploaded_file.name}")
 
-        # 日志占位符，实时更新日志
-        log_placeholder = st.empty()
-
-        # 翻译并生成可以下载的JSON
-        with st.spinner('正在翻译...'):
-            translated_json_io = translate_and_save_json(uploaded_file, log_placeholder)
-
-        st.success('翻译完成！')
-
-        # 提供下载链接
+        previous = None
+        if previous_files and not streaming and not multilingual:
+            previous = tuple(f.getvalue() for f in previous_files)
+        job = get_job_manager().submit(uploaded_file.getvalue(), uploaded_file.name, prompt=sys_prompt,
+                                       protocol=protocol, max_workers=concurrency, glossary=glossary,
+                                       streaming=streaming, previous=previous, indent=indent, rules=rules,
+                                       languages=languages, retry=st.session_state.pop("retry_job", False))
+
+        # 任务未结束时定时重跑页面以刷新进度
+        if not job.done:
+            st.info(f"任务 {job.id[:8]} {'排队中' if job.status == QUEUED else '正在翻译'}...")
+            st.markdown(job.log.message)
+            time.sleep(POLL_INTERVAL)
+            st.rerun()
+
+        if job.status == FAILED:
+            st.error(f"翻译失败: {job.error!r}（已完成的批次已保存，重试时从断点继续）")
+            if st.button("重试"):
+                st.session_state["retry_job"] = True
+                st.rerun()
+            return
+
+        st.success('翻译完成！（命中结果缓存）' if job.cached else '翻译完成！')
+        if job.log.message:
+            st.markdown(job.log.message)
+        if job.log.warnings:
+            with st.expander(f"模型返回异常的批次: {len(job.log.warnings)}"):
+                for warning in job.log.warnings:
+                    st.text(warning)
+
+        # 各阶段耗时和批次统计，可下载为 JSON 报告或 Prometheus 文本指标
+        if job.metrics:
+            with st.expander("运行报告"):
+                metrics = job.metrics
+                report = metrics.report()
+                st.table([{"阶段": name, "耗时（秒）": round(seconds, 3)} for name, seconds in report["stages"].items()])
+                st.json({key: value for key, value in report.items() if key != "per_batch"})
+                st.download_button("下载运行报告（JSON）", data=metrics.to_json(), file_name="run_report.json",
+                                   mime="application/json")
+                st.download_button("下载指标（Prometheus）", data=metrics.to_prometheus(), file_name="metrics.prom",
+                                   mime="text/plain")
+
+        # 列出重试后仍未翻译的条目及其位置
+        if job.failures:
+            with st.expander(f"未翻译的条目: {len(job.failures)}"):
+                st.table(job.failures)
+            if st.button("重新翻译未翻译的条目"):
+                st.session_state["retry_job"] = True
+                st.rerun()
+
+        # 提供下载链接；点击时才从结果文件读取，页面重跑时不在会话中保留结果的副本
         st.subheader("下载翻译后的JSON文件")
-        st.download_button(
-            label="下载翻译后的JSON",
-            data=translated_json_io,
-            file_name="translated_" + uploaded_file.name,
-            mime="application/json"
-        )
-
+        if multilingual:
+            st.download_button(
+                label="下载翻译后的JSON（zip，每种语言一个文件）",
+                data=lambda: open(job.result_path, 'rb'),
+                file_name="translated_" + uploaded_file.name.rsplit(".", 1)[0] + ".zip",
+                mime="application/zip"
+            )
+        else:
+            st.download_button(
+                label="下载翻译后的JSON",
+                data=lambda: open(job.result_path, 'rb'),
+                file_name="translated_" + uploaded_file.name,
+                mime="application/json"
+            )
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -1,28 +1,18 @@
 import json
 import logging
-import os
 from dotenv import load_dotenv
 import streamlit as st
 from io import StringIO
-from groq import Groq
-from openai.lib.azure import AzureOpenAI
+from cjk import contains_cjk
+from llm_client import get_provider
 
 # 配置日志
 logging.basicConfig(format='[%(asctime)s %(filename)s:%(lineno)d] %(levelname)s: %(message)s', level=logging.INFO, force=True)
 
 load_dotenv(override=True)
 
-provider = os.environ.get("LLM_PROVIDER")
-if provider == "azure":
-    client = AzureOpenAI(
-        api_key=os.environ['AZURE_OPENAI_GPT4oMINI_API_KEY'],
-        api_version=os.environ['OPENAI_API_GPT4oMINI_VERSION'],
-        azure_endpoint=os.environ['AZURE_OPENAI_GPT4oMINI_ENDPOINT']
-    )
-    model = os.environ['OPENAI_GPT4OMIN_DEPLOYMENT_NAME']
-else:
-    client = Groq(api_key=os.environ.get("GROQ_API_KEY"), )
-    model = "llama-3.1-70b-versatile"
+# 服务商客户端在第一次翻译时才创建，并在 Streamlit 重跑之间复用连接池
+provider = get_provider()
 
 
 # 假设这个函数已经实现了，将中文翻译为英文
@@ -36,8 +26,7 @@ def translate_text(text):
     6）专票或增值税专用发票: Special VAT Invoice
     7）普票或增值税普通发票: Normal VAT Invoice
     输出要求：1）不要改动非中文以外的任何符号；2）只返回翻译结果，不要包含其他内容"""
-    completion = client.chat.completions.create(
-        model=model,
+    completion = provider.complete(
         messages=[
             {
                 "role": "system",
@@ -51,7 +40,7 @@ def translate_text(text):
         temperature=0,
     )
 
-    ret = completion.choices[0].message.content
+    ret = completion.content
     return ret
 
 
@@ -67,7 +56,7 @@ def translate_json(data, log_placeholder=None):
             data[i] = translate_json(data[i], log_placeholder)
     elif isinstance(data, str):
         # 如果是字符串，检查是否包含中文
-        if any('\u4e00' <= char <= '\u9fff' for char in data):
+        if contains_cjk(data):
             ret = translate_text(data)
             if log_placeholder:
                 log_placeholder.markdown(f"```Source```：{data}<br>```Translated``` ：{ret}",  unsafe_allow_html=True)
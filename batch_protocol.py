@@ -0,0 +1,97 @@
+import json
+import os
+import re
+
+
+# 原有协议：用分隔符把一批文本拼在一起，按分隔符切分返回结果；条目数对不上时整批失败
+class SplitTagProtocol:
+    name = "split_tag"
+    max_items = 30
+
+    def __init__(self, split_tag='\n🚀'):
+        self.split_tag = split_tag
+
+    def build_messages(self, sys_prompt, batch):
+        return [{"role": "system", "content": sys_prompt}, {"role": "user", "content": self.split_tag.join(batch)}]
+
+    def request_options(self):
+        return {}
+
+    # 返回与 batch 等长的列表，失败的条目为 None
+    def parse(self, content, batch):
+        translated_batch = content.split(self.split_tag)
+        if len(translated_batch) != len(batch):
+            return [None] * len(batch)
+        return translated_batch
+
+
+# 结构化协议：以带编号的 JSON 对象发送一批文本，要求模型返回同样编号的 JSON 对象，按编号而不是位置对应结果
+# 模型漏掉、合并或多出的条目只影响其自身，其余条目照常使用
+class JsonProtocol:
+    name = "json"
+    max_items = 100
+
+    instruction = ("\n输入格式：一个 JSON 对象，键是条目编号，值是待翻译的文本。\n"
+                   "输出格式：只返回一个 JSON 对象，包含与输入完全相同的键，值为对应文本的翻译结果，不要增加或遗漏任何键。")
+
+    # json_mode 为 True 时请求服务商的 JSON 模式（OpenAI、Azure OpenAI 和 Groq 均支持 response_format=json_object）
+    def __init__(self, json_mode=True):
+        self.json_mode = json_mode
+
+    def build_messages(self, sys_prompt, batch):
+        payload = {str(i + 1): text for i, text in enumerate(batch)}
+        return [{"role": "system", "content": sys_prompt + self.instruction},
+                {"role": "user", "content": json.dumps(payload, ensure_ascii=False)}]
+
+    def request_options(self):
+        return {"response_format": {"type": "json_object"}} if self.json_mode else {}
+
+    def parse(self, content, batch):
+        items = _load_json_object(content)
+        results = []
+        for i in range(len(batch)):
+            value = items.get(str(i + 1))
+            results.append(value if isinstance(value, str) else None)
+        return results
+
+
+# 解析模型返回的 JSON 对象；整体解析失败（例如输出被截断）时，逐条提取完整的 "编号": "译文" 对
+_ITEM = re.compile(r'"(\d+)"\s*:\s*("[^"\\]*(?:\\.[^"\\]*)*")', re.DOTALL)
+
+
+def _load_json_object(content):
+    text = content.strip()
+    if text.startswith("```"):
+        text = text.strip("`")
+        text = text[text.find("{"):] if "{" in text else text
+    try:
+        data = json.loads(text)
+        if isinstance(data, dict):
+            # 兼容模型把结果包在单个外层键里的情况，例如 {"translations": {...}}
+            if len(data) == 1 and isinstance(next(iter(data.values())), dict):
+                data = next(iter(data.values()))
+            return data
+    except ValueError:
+        pass
+
+    items = {}
+    for key, raw in _ITEM.findall(text):
+        try:
+            items[key] = json.loads(raw)
+        except ValueError:
+            continue
+    return items
+
+
+PROTOCOLS = {
+    SplitTagProtocol.name: SplitTagProtocol,
+    JsonProtocol.name: JsonProtocol,
+}
+
+
+# 按名称创建协议，默认由环境变量 TRANSLATE_PROTOCOL 决定
+def get_protocol(name=None):
+    name = name or os.environ.get("TRANSLATE_PROTOCOL", SplitTagProtocol.name)
+    if name not in PROTOCOLS:
+        raise ValueError(f"Unknown batch protocol: {name}")
+    return PROTOCOLS[name]()
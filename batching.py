@@ -0,0 +1,131 @@
+import os
+import threading
+from collections import deque
+
+from cjk import count_cjk
+
+# 各模型每个请求的 (输入, 输出) token 预算，输出预算留足余量，避免长回复被截断
+TOKEN_BUDGETS = {
+    "gpt-4o-mini": (8000, 6000),
+    "llama-3.1-70b-versatile": (4000, 3000),
+}
+DEFAULT_TOKEN_BUDGET = (4000, 3000)
+
+# 按失配情况调整批次大小：失配时减半，每次成功后小步恢复（AIMD），失配越频繁批次越小
+MIN_SCALE = 1 / 16
+RECOVERY_STEP = 0.1
+EWMA_ALPHA = 0.2
+
+# 每个模型在进程内保留的最近批次延迟条数，用于预估任务耗时
+LATENCY_WINDOW = int(os.environ.get("TRANSLATE_LATENCY_WINDOW", 100))
+
+
+# 粗略估算输入 token 数：中文约每字 1 个 token，其他字符约每 4 个字符 1 个 token
+def estimate_tokens(text):
+    cjk_chars = count_cjk(text)
+    return cjk_chars + (len(text) - cjk_chars) // 4 + 1
+
+
+# 粗略估算译文 token 数：中文译成英文后约每字 0.8 个 token，非中文部分原样输出
+def estimate_output_tokens(text):
+    cjk_chars = count_cjk(text)
+    return int(cjk_chars * 0.8) + (len(text) - cjk_chars) // 4 + 1
+
+
+# 读取模型的 token 预算，环境变量 TRANSLATE_MAX_INPUT_TOKENS / TRANSLATE_MAX_OUTPUT_TOKENS 优先
+def token_budget(model):
+    max_input, max_output = TOKEN_BUDGETS.get(model, DEFAULT_TOKEN_BUDGET)
+    max_input = int(os.environ.get("TRANSLATE_MAX_INPUT_TOKENS", max_input))
+    max_output = int(os.environ.get("TRANSLATE_MAX_OUTPUT_TOKENS", max_output))
+    return max_input, max_output
+
+
+# 按 token 预算装箱的自适应分批器，同一模型在进程内共享，观察到的失配率会影响后续所有任务
+class AdaptiveBatcher:
+    def __init__(self, max_input_tokens, max_output_tokens, max_items=30):
+        self.max_input_tokens = max_input_tokens
+        self.max_output_tokens = max_output_tokens
+        self.max_items = max_items
+        self.scale = 1.0
+        self.mismatch_rate = 0.0
+        self._lock = threading.Lock()
+
+    # 当前生效的限制：(输入 token, 输出 token, 条目数)
+    def limits(self):
+        scale = self.scale
+        return (self.max_input_tokens * scale, self.max_output_tokens * scale,
+                max(1, int(self.max_items * scale)))
+
+    # 依次产出批次（texts 的下标列表）；每个批次开始时读取最新的 scale，因此调整对后续批次立即生效
+    # 单条就超出预算的长文本单独成批
+    def iter_batches(self, texts, indices):
+        for batch, _, _ in self._iter_batches(texts, indices):
+            yield batch
+
+    # 按当前的 scale 一次性分好批，返回 [(批次, 估算的输入 token 数, 估算的输出 token 数)]，用于预估开销
+    def plan(self, texts, indices):
+        return list(self._iter_batches(texts, indices))
+
+    def _iter_batches(self, texts, indices):
+        batch = []
+        input_tokens = output_tokens = 0
+        max_input, max_output, max_items = self.limits()
+        for i in indices:
+            text = texts[i]
+            item_input = estimate_tokens(text)
+            item_output = estimate_output_tokens(text)
+            if item_input > max_input or item_output > max_output:
+                yield [i], item_input, item_output
+                max_input, max_output, max_items = self.limits()
+                continue
+            if batch and (input_tokens + item_input > max_input or output_tokens + item_output > max_output
+                          or len(batch) >= max_items):
+                yield batch, input_tokens, output_tokens
+                batch = []
+                input_tokens = output_tokens = 0
+                max_input, max_output, max_items = self.limits()
+            batch.append(i)
+            input_tokens += item_input
+            output_tokens += item_output
+        if batch:
+            yield batch, input_tokens, output_tokens
+
+    # 记录一个批次的结果；单条文本的失败与批次大小无关，不参与调整
+    def record(self, batch_len, mismatched):
+        if batch_len <= 1:
+            return
+        with self._lock:
+            self.mismatch_rate = (1 - EWMA_ALPHA) * self.mismatch_rate + EWMA_ALPHA * mismatched
+            if mismatched:
+                self.scale = max(MIN_SCALE, self.scale / 2)
+            else:
+                self.scale = min(1.0, self.scale + RECOVERY_STEP)
+
+
+_batchers = {}
+_batchers_lock = threading.Lock()
+
+
+# 获取模型对应的分批器
+def get_batcher(model, max_items=30):
+    with _batchers_lock:
+        key = (model, max_items)
+        if key not in _batchers:
+            _batchers[key] = AdaptiveBatcher(*token_budget(model), max_items=max_items)
+        return _batchers[key]
+
+
+_latencies = {}
+_latencies_lock = threading.Lock()
+
+
+# 记录模型的一个批次延迟（秒），只保存在内存中，每个模型保留最近 LATENCY_WINDOW 条
+def record_latency(model, latency):
+    with _latencies_lock:
+        _latencies.setdefault(model, deque(maxlen=LATENCY_WINDOW)).append(latency)
+
+
+# 模型最近的批次延迟（秒），从新到旧
+def recent_latencies(model):
+    with _latencies_lock:
+        return list(reversed(_latencies.get(model, ())))
@@ -0,0 +1,97 @@
+# 中文检测的微基准：对比原来的逐字符生成器写法与 cjk 模块的预编译正则
+# 用法：python benchmarks/bench_cjk.py --size-mb 5
+import argparse
+import json
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from cjk import classify_cjk, contains_cjk  # noqa: E402
+
+WORDS_ZH = ["发票", "开票项", "蓝票", "红字发票", "数电票", "税率", "购买方名称", "销售方纳税人识别号",
+            "金额", "备注", "审核状态", "接口说明", "请求参数", "返回结果", "是否必填"]
+WORDS_EN = ["invoice", "amount", "taxRate", "buyerName", "sellerTaxNo", "status", "remark", "id",
+            "type", "string", "integer", "required", "example", "description"]
+
+
+# 生成类似 apifox 接口导出的 JSON：英文键、ID、示例值和中英混排的描述
+def make_document(target_bytes, seed=0):
+    rng = random.Random(seed)
+    apis = []
+    size = 0
+    while size < target_bytes:
+        fields = {}
+        for _ in range(rng.randint(5, 20)):
+            name = rng.choice(WORDS_EN) + str(rng.randint(0, 999))
+            fields[name] = {
+                "type": rng.choice(["string", "integer", "number"]),
+                "description": "".join(rng.choice(WORDS_ZH) for _ in range(rng.randint(1, 6)))
+                if rng.random() < 0.6 else " ".join(rng.choice(WORDS_EN) for _ in range(rng.randint(3, 12))),
+                "example": f"{rng.randint(0, 10 ** 8):08d}",
+                "x-apifox-orders": [rng.choice(WORDS_EN) for _ in range(3)],
+            }
+        api = {"id": rng.randint(0, 10 ** 9), "name": rng.choice(WORDS_ZH) + "接口",
+               "path": "/api/" + "/".join(rng.choice(WORDS_EN) for _ in range(3)),
+               "properties": fields}
+        apis.append(api)
+        size += len(json.dumps(api, ensure_ascii=False).encode("utf-8"))
+    return {"apis": apis}
+
+
+def iter_strings(data):
+    stack = [data]
+    while stack:
+        node = stack.pop()
+        if isinstance(node, dict):
+            stack.extend(node.values())
+        elif isinstance(node, list):
+            stack.extend(node)
+        elif isinstance(node, str):
+            yield node
+
+
+# 原实现：Python 生成器逐字符比较
+def legacy_contains(text):
+    return any('\u4e00' <= char <= '\u9fff' for char in text)
+
+
+def best_of(func, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        timings.append(time.perf_counter() - start)
+    return min(timings), result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="CJK detector micro-benchmark")
+    parser.add_argument("--size-mb", type=float, default=5.0, help="size of the synthetic JSON document")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    document = make_document(int(args.size_mb * 1024 * 1024))
+    strings = list(iter_strings(document))
+    print(f"document: {args.size_mb:.1f} MB, {len(strings)} strings")
+
+    cases = [
+        ("legacy generator", lambda: [legacy_contains(s) for s in strings]),
+        ("contains_cjk", lambda: [contains_cjk(s) for s in strings]),
+        ("classify_cjk (batch)", lambda: classify_cjk(strings)),
+    ]
+    baseline = None
+    expected = None
+    for name, func in cases:
+        elapsed, flags = best_of(func, args.repeat)
+        baseline = baseline or elapsed
+        # 原实现只识别基本汉字，这里的测试数据不含扩展区字符和全角标点，结果应完全一致
+        expected = expected or flags
+        assert flags == expected, f"{name} disagrees with the legacy detector"
+        print(f"{name:<22} {elapsed * 1000:9.1f} ms  {baseline / elapsed:6.1f}x  ({sum(flags)} CJK)")
+
+
+if __name__ == "__main__":
+    main()
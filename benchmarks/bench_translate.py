@@ -0,0 +1,119 @@
+# 端到端翻译吞吐基准：用离线模拟服务商对不同规模、深度和中文密度的合成 JSON 运行 translate_and_save_json
+# 用法：python benchmarks/bench_translate.py --latency 0.05 --concurrency 8
+import argparse
+import io
+import json
+import logging
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import translator  # noqa: E402
+from batch_protocol import PROTOCOLS, get_protocol  # noqa: E402
+from mock_provider import MockProvider  # noqa: E402
+from translation_memory import TranslationMemory  # noqa: E402
+
+WORDS_ZH = ["发票", "开票项", "蓝票", "红字发票", "数电票", "税率", "购买方名称", "销售方纳税人识别号",
+            "金额", "备注", "审核状态", "接口说明", "请求参数", "返回结果", "是否必填", "专票", "普票"]
+WORDS_EN = ["invoice", "amount", "taxRate", "buyerName", "sellerTaxNo", "status", "remark", "id"]
+
+# (名称, 字符串个数, 嵌套深度, 中文字符串占比, 中文文本的取值种类数)
+CORPORA = [
+    ("small-flat", 1000, 2, 0.5, 300),
+    ("medium-nested", 10000, 8, 0.3, 2000),
+    ("large-dense", 50000, 4, 0.8, 10000),
+    ("deep-sparse", 20000, 40, 0.1, 1000),
+]
+
+
+# 生成合成 JSON：共 n_strings 个字符串叶子，按 depth 层嵌套，cjk_ratio 比例的字符串含中文
+def make_corpus(n_strings, depth, cjk_ratio, vocabulary, seed=0):
+    rng = random.Random(seed)
+    phrases = ["".join(rng.choice(WORDS_ZH) for _ in range(rng.randint(1, 8))) + f"（{i}）"
+               for i in range(vocabulary)]
+
+    def leaf():
+        if rng.random() < cjk_ratio:
+            return rng.choice(phrases)
+        return " ".join(rng.choice(WORDS_EN) for _ in range(rng.randint(1, 6)))
+
+    leaves_per_node = max(1, n_strings // max(1, depth * 10))
+    root = []
+    produced = 0
+    while produced < n_strings:
+        # 每条链路嵌套 depth 层，最内层挂一组字符串
+        node = {"items": [leaf() for _ in range(leaves_per_node)]}
+        produced += leaves_per_node
+        for level in range(depth - 1):
+            node = {"level": level, "child": node} if level % 2 else [node]
+        root.append(node)
+    return root
+
+
+def run_case(document, provider, max_workers, protocol):
+    payload = json.dumps(document, ensure_ascii=False).encode("utf-8")
+    _, locations = translator.collect_translations(json.loads(payload))
+    n_strings = len(locations)
+
+    # 每个用例使用空的翻译记忆，保证所有文本都真正经过服务商
+    with tempfile.TemporaryDirectory() as tmp:
+        translator.provider = provider
+        translator.translation_memory = TranslationMemory(os.path.join(tmp, "tm.sqlite3"))
+        cwd = os.getcwd()
+        os.chdir(tmp)
+        tracemalloc.start()
+        started = time.perf_counter()
+        try:
+            translator.translate_and_save_json(io.BytesIO(payload), None, max_workers=max_workers, protocol=protocol)
+        finally:
+            elapsed = time.perf_counter() - started
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            os.chdir(cwd)
+            translator.translation_memory.close()
+
+    return {
+        "strings": n_strings,
+        "seconds": elapsed,
+        "strings_per_sec": n_strings / elapsed if elapsed else 0.0,
+        "calls": provider.calls,
+        "calls_per_1000": provider.calls * 1000 / n_strings if n_strings else 0.0,
+        "peak_mb": peak / 2 ** 20,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="End-to-end translation throughput benchmark (offline)")
+    parser.add_argument("--latency", type=float, default=0.05, help="mock provider base latency per call (s)")
+    parser.add_argument("--jitter", type=float, default=0.02)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--corruption-rate", type=float, default=0.002, help="per-item format corruption rate")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--protocol", choices=list(PROTOCOLS), default="split_tag")
+    parser.add_argument("--scale", type=float, default=1.0, help="multiply corpus sizes")
+    parser.add_argument("--json", action="store_true", help="print results as JSON lines")
+    args = parser.parse_args()
+    logging.disable(logging.WARNING)
+
+    if not args.json:
+        print(f"{'corpus':<15} {'strings':>8} {'sec':>8} {'str/s':>9} {'calls':>6} {'calls/1k':>9} {'peak MB':>8}")
+    for name, n_strings, depth, cjk_ratio, vocabulary in CORPORA:
+        document = make_corpus(int(n_strings * args.scale), depth, cjk_ratio, vocabulary)
+        # 每个用例使用不同的模型名，避免自适应分批器的状态在用例之间延续
+        provider = MockProvider(model=f"mock-{name}", latency=args.latency, jitter=args.jitter,
+                                error_rate=args.error_rate, corruption_rate=args.corruption_rate, seed=0)
+        result = run_case(document, provider, args.concurrency, get_protocol(args.protocol))
+        if args.json:
+            print(json.dumps({"corpus": name, "protocol": args.protocol, **result}))
+        else:
+            print(f"{name:<15} {result['strings']:>8} {result['seconds']:>8.2f} {result['strings_per_sec']:>9.0f} "
+                  f"{result['calls']:>6} {result['calls_per_1000']:>9.1f} {result['peak_mb']:>8.1f}")
+
+
+if __name__ == "__main__":
+    main()
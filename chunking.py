@@ -0,0 +1,118 @@
+import os
+import re
+
+from batching import estimate_tokens
+from cjk import contains_cjk
+
+# 估算 token 数超过此值的文本切分成多块分别翻译，可通过环境变量调整
+CHUNK_TOKENS = int(os.environ.get("TRANSLATE_CHUNK_TOKENS", 500))
+
+# 切分点：换行（包括空行分隔的段落）和句末标点；切分点处的空白原样保留，不发送给模型
+LINE_BREAK = re.compile(r"[ \t]*\r?\n\s*")
+SENTENCE_END = re.compile(r"(?<=[。！？；])[ \t]*|(?<=[.!?;])[ \t]+")
+_ASCII_END = (".", "!", "?", ";")
+
+
+# 把超长文本切分为 [(片段, 是否需要翻译)]，所有片段按顺序拼接后与原文完全相同
+# 按换行切分为行，换行和段落之间的空行都不经过模型，保证行结构不变；仍然超过 max_tokens 的行在句末切分，
+# 再把相邻的句子合并到不超过 max_tokens（行内句子之间的空格随块发送）；找不到句末标点的长句作为一块
+# 首尾空白和不含中文的行原样保留
+def split_text(text, max_tokens=None):
+    max_tokens = max_tokens or CHUNK_TOKENS
+    rest = text.lstrip()
+    core = rest.rstrip()
+    lead, trail = text[:len(text) - len(rest)], rest[len(core):]
+
+    pieces = [(lead, False)] if lead else []
+    for i, line in enumerate(_split(LINE_BREAK, core)):
+        if i % 2:
+            pieces.append((line, False))
+        elif estimate_tokens(line) > max_tokens:
+            for j, piece in enumerate(_merge(_split(SENTENCE_END, line), max_tokens)):
+                if piece:
+                    pieces.append((piece, j % 2 == 0 and contains_cjk(piece)))
+        elif line:
+            pieces.append((line, contains_cjk(line)))
+    if trail:
+        pieces.append((trail, False))
+    return pieces
+
+
+# 按 pattern 切分，返回 [块, 分隔符, 块, 分隔符, ..., 块]；忽略文本首尾的匹配
+def _split(pattern, text):
+    pieces = []
+    pos = 0
+    for match in pattern.finditer(text):
+        if match.start() == 0 or match.end() == len(text):
+            continue
+        pieces += [text[pos:match.start()], match.group()]
+        pos = match.end()
+    pieces.append(text[pos:])
+    return pieces
+
+
+# 把相邻的块连同中间的分隔符合并，使每块尽量接近但不超过 max_tokens
+def _merge(pieces, max_tokens):
+    merged = [pieces[0]]
+    for separator, piece in zip(pieces[1::2], pieces[2::2]):
+        candidate = merged[-1] + separator + piece
+        if estimate_tokens(candidate) <= max_tokens:
+            merged[-1] = candidate
+        else:
+            merged += [separator, piece]
+    return merged
+
+
+# 一组文本的切分计划：units 是实际要翻译的文本（普通文本和超长文本切出的块，已去重），assemble 把译文按原顺序拼回
+class ChunkPlan:
+    def __init__(self, texts, max_tokens=None):
+        max_tokens = max_tokens or CHUNK_TOKENS
+        self.texts = texts
+        self.chunked = {}  # 被切分的文本下标 -> [片段或 units 下标]
+        index = {}
+        for i, text in enumerate(texts):
+            # 每个字符最多算 1 个 token，短文本无需估算
+            if len(text) >= max_tokens and estimate_tokens(text) > max_tokens:
+                layout = []
+                for piece, translate in split_text(text, max_tokens):
+                    layout.append(index.setdefault(piece, len(index)) if translate else piece)
+                self.chunked[i] = layout
+            else:
+                index.setdefault(text, len(index))
+        self.units = list(index)
+        self._index = index
+
+    # translated_units 与 units 一一对应，failed_units 为翻译失败的 units 下标
+    # 返回 (与 texts 一一对应的译文, 失败的 texts 下标)；任一块失败的文本整体保留原文
+    def assemble(self, translated_units, failed_units=()):
+        failed_units = set(failed_units)
+        translated = []
+        failed = []
+        for i, text in enumerate(self.texts):
+            layout = self.chunked.get(i)
+            if layout is None:
+                unit = self._index[text]
+                translated.append(text if unit in failed_units else translated_units[unit])
+                if unit in failed_units:
+                    failed.append(i)
+            elif any(isinstance(piece, int) and piece in failed_units for piece in layout):
+                translated.append(text)
+                failed.append(i)
+            else:
+                translated.append(_join(layout, translated_units))
+        return translated, failed
+
+
+# 拼接译文；中文句末标点处切开的两块之间原本没有空白，译成英文后在句号和下一句之间补一个空格
+def _join(layout, translated_units):
+    parts = []
+    previous_unit = False
+    for piece in layout:
+        is_unit = isinstance(piece, int)
+        if is_unit:
+            piece = translated_units[piece]
+            if previous_unit and parts[-1][-1:] in _ASCII_END and piece[:1].isascii() and piece[:1].isalnum():
+                parts.append(" ")
+        parts.append(piece)
+        previous_unit = is_unit
+    return "".join(parts)
@@ -0,0 +1,32 @@
+import re
+
+# 需要翻译的字符范围：CJK 统一汉字及扩展 A-G、兼容汉字、CJK 标点和全角标点（不含全角数字和字母）
+CJK_RANGES = (
+    "\u3001-\u303f"                                      # CJK 符号和标点（不含全角空格）
+    "\u3400-\u4dbf"                                      # 扩展 A
+    "\u4e00-\u9fff"                                      # 基本汉字
+    "\uf900-\ufaff"                                      # 兼容汉字
+    "\uff01-\uff0f\uff1a-\uff20\uff3b-\uff40\uff5b-\uff65"  # 全角标点
+    "\U00020000-\U0002a6df"                              # 扩展 B
+    "\U0002a700-\U0002ebef"                              # 扩展 C-F
+    "\U0002f800-\U0002fa1f"                              # 兼容汉字补充
+    "\U00030000-\U0003134f"                              # 扩展 G
+)
+CJK_PATTERN = re.compile(f"[{CJK_RANGES}]")
+
+_search = CJK_PATTERN.search
+
+
+# 判断文本中是否包含中文字符
+def contains_cjk(text):
+    return _search(text) is not None
+
+
+# 批量判断一组文本是否包含中文，逐项迭代都在 C 层完成，比逐个调用 contains_cjk 更快
+def classify_cjk(texts):
+    return list(map(bool, map(_search, texts)))
+
+
+# 统计文本中的中文字符个数，用于估算 token 数
+def count_cjk(text):
+    return len(CJK_PATTERN.findall(text))
@@ -0,0 +1,261 @@
+import argparse
+import glob
+import hashlib
+import json
+import logging
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import translator
+from batch_protocol import PROTOCOLS, get_protocol
+from glossary import Glossary
+from job_journal import JobJournal, file_digest, job_id
+from path_rules import PathRules
+from run_metrics import RunMetrics
+from translator import (apply_translations, collect_previous, collect_translations, dedup_texts, report_failures,
+                        reuse_previous, write_json)
+
+# 配置日志
+logging.basicConfig(format='[%(asctime)s %(filename)s:%(lineno)d] %(levelname)s: %(message)s', level=logging.INFO, force=True)
+
+
+# 展开输入：目录递归查找其中的 .json 文件，其余按 glob 模式匹配；返回 [(源文件, 相对输出路径)]
+def expand_inputs(inputs):
+    files = []
+    for pattern in inputs:
+        if os.path.isdir(pattern):
+            for dirpath, _, filenames in os.walk(pattern):
+                for filename in sorted(filenames):
+                    if filename.endswith(".json"):
+                        path = os.path.join(dirpath, filename)
+                        files.append((path, os.path.relpath(path, pattern)))
+        else:
+            matches = sorted(glob.glob(pattern, recursive=True))
+            if not matches:
+                logging.warning(f"No files match: {pattern}")
+            # 相对路径以模式中第一个通配符之前的目录为基准
+            base = pattern
+            while glob.has_magic(base):
+                base = os.path.dirname(base)
+            base = base if os.path.isdir(base) else os.path.dirname(base)
+            for path in matches:
+                if os.path.isfile(path):
+                    files.append((path, os.path.relpath(path, base or ".")))
+    return files
+
+
+def _read_json(path):
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+# 解析文件并收集待翻译的位置；previous 为 (上一版原文, 上一版译文) 路径时，先沿用上一版中未改动文本的译文
+def _load_locations(path, previous=None, rules=None):
+    root, locations = collect_translations(_read_json(path), rules)
+    if previous:
+        locations = reuse_previous(locations, collect_previous(*map(_read_json, previous)))
+    return root, locations
+
+
+# 工作进程：解析文件并收集需要翻译的唯一文本
+def _extract(path, previous=None, rules=None):
+    _, locations = _load_locations(path, previous, rules)
+    return list(dict.fromkeys(parent[key] for parent, key, _ in locations))
+
+
+# 工作进程：重新解析文件，写回译文并序列化到输出路径；返回未翻译的条目数
+def _apply_and_write(path, output_path, translation_map, failed_texts, indent, previous=None, rules=None):
+    root, locations = _load_locations(path, previous, rules)
+    failures = []
+    report_failures(locations, failed_texts, failures)
+    apply_translations(locations, translation_map)
+
+    os.makedirs(os.path.dirname(output_path) or ".", exist_ok=True)
+    write_json(root[0], output_path, indent)
+    return len(failures)
+
+
+# 一组输入文件的内容哈希，用作断点续传日志的任务 ID
+def _files_digest(files):
+    digest = hashlib.sha256()
+    for path, relative in files:
+        with open(path, "rb") as f:
+            digest.update(f"{relative}\0{file_digest(f)}\n".encode("utf-8"))
+    return digest.hexdigest()
+
+
+# 批量翻译：解析和序列化在进程池中并行；所有文件的文本合并去重后，经同一个有并发上限的请求队列发送给模型
+# metrics 记录 collect/translate/write 阶段耗时和每个模型批次
+# previous 与 files 一一对应，每项为 (上一版原文, 上一版译文) 路径或 None，用于增量翻译
+# resume 为 True 时模型请求的结果写入断点续传日志，中断后对同一组文件重新运行即从断点继续；glossary 见 translator.translate_text
+# rules 为 PathRules，只翻译规则允许的路径下的文本
+# languages 为目标语言列表（默认只有英文）；多于一种时各语言并发翻译，输出写入 output_dir/<语言>/ 下，每种语言有各自的断点续传日志
+def translate_files(files, output_dir, workers=None, max_workers=None, protocol=None, indent=4, metrics=None,
+                    previous=None, resume=True, glossary=None, rules=None, languages=None):
+    metrics = metrics or RunMetrics()
+    languages = list(dict.fromkeys(languages or ["en"]))
+    journals = {}
+    if resume:
+        digest = _files_digest(files)
+        for language in languages:
+            journal = JobJournal.for_job(job_id(digest, translator.language_prompt(language),
+                                                translator.provider.model))
+            if journal.completed:
+                logging.info(f"Resuming {language} from {journal.path}: "
+                             f"{len(journal.completed)} texts already translated")
+            journals[language] = journal
+    previous = previous or [None] * len(files)
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        started = time.perf_counter()
+        with metrics.stage("collect"):
+            per_file = list(pool.map(_extract, [path for path, _ in files], previous, [rules] * len(files)))
+        logging.info(f"Extracted {len(files)} files in {time.perf_counter() - started:.2f}s")
+
+        all_texts = [text for texts in per_file for text in texts]
+        unique_texts = []
+        results = {}
+        if all_texts:
+            with metrics.stage("dedup"):
+                unique_texts = dedup_texts(all_texts)
+            try:
+                with metrics.stage("translate"):
+                    results = translator.translate_languages(unique_texts, languages, max_workers=max_workers,
+                                                             protocol=protocol, metrics=metrics, journals=journals,
+                                                             glossary=glossary)
+            finally:
+                for journal in journals.values():
+                    journal.close()
+
+        # 每个工作进程只拿到自己文件用到的译文
+        futures = []
+        for language in languages:
+            translated_texts, failed = results.get(language, ([], []))
+            translation_map = dict(zip(unique_texts, translated_texts))
+            failed_texts = {unique_texts[i] for i in failed}
+            language_dir = os.path.join(output_dir, language) if len(languages) > 1 else output_dir
+            for (path, relative), texts, file_previous in zip(files, per_file, previous):
+                output_path = os.path.join(language_dir, relative)
+                file_map = {text: translation_map[text] for text in texts}
+                file_failed = failed_texts.intersection(texts)
+                futures.append((output_path, pool.submit(_apply_and_write, path, output_path, file_map, file_failed,
+                                                         indent, file_previous, rules)))
+
+        failed_count = 0
+        with metrics.stage("write"):
+            for output_path, future in futures:
+                count = future.result()
+                failed_count += count
+                logging.info(f"Wrote {output_path} ({count} untranslated)")
+    for journal in journals.values():
+        journal.finish()
+    logging.info(metrics.summary())
+    return failed_count
+
+
+# 预估批量翻译的开销，不请求模型也不写出文件：解析、去重后按各目标语言查缓存并分批，见 translator.estimate_languages
+def estimate_files(files, workers=None, max_workers=None, protocol=None, previous=None, resume=True, glossary=None,
+                   rules=None, languages=None):
+    languages = list(dict.fromkeys(languages or ["en"]))
+    journals = {}
+    if resume:
+        digest = _files_digest(files)
+        journals = {language: JobJournal.for_job(job_id(digest, translator.language_prompt(language),
+                                                        translator.provider.model))
+                    for language in languages}
+    previous = previous or [None] * len(files)
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        per_file = list(pool.map(_extract, [path for path, _ in files], previous, [rules] * len(files)))
+    all_texts = [text for texts in per_file for text in texts]
+    unique_texts = list(dict.fromkeys(all_texts))
+    estimate = translator.estimate_languages(unique_texts, languages, max_workers=max_workers, protocol=protocol,
+                                             journals=journals, glossary=glossary)
+    estimate.update(files=len(files), strings=len(all_texts), unique=len(unique_texts))
+    logging.info(translator.format_estimate(estimate))
+    return estimate
+
+
+# 为每个输入文件找到上一版的原文和译文：传入目录时按相对路径对应，传入文件时直接使用；缺少任一文件时该文件全量翻译
+def find_previous(files, previous_source, previous_output):
+    pairs = []
+    for _, relative in files:
+        source, output = previous_source, previous_output
+        if os.path.isdir(source):
+            source = os.path.join(source, relative)
+        if os.path.isdir(output):
+            output = os.path.join(output, relative)
+        pairs.append((source, output) if os.path.isfile(source) and os.path.isfile(output) else None)
+    return pairs
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Translate Chinese strings in JSON files to English or other target languages.")
+    parser.add_argument("inputs", nargs="+", help="JSON files, directories or glob patterns")
+    parser.add_argument("-o", "--output-dir", required=True, help="directory for the translated copies")
+    parser.add_argument("--workers", type=int, default=None, help="processes for parsing and serialization")
+    parser.add_argument("--concurrency", type=int, default=None, help="concurrent LLM requests")
+    parser.add_argument("--protocol", choices=list(PROTOCOLS), default=None, help="batch wire format")
+    parser.add_argument("--indent", type=int, default=4, help="output indentation")
+    parser.add_argument("--compact", action="store_true", help="write compact JSON instead of indenting")
+    parser.add_argument("--previous-source", default=None,
+                        help="previous version of the inputs (file or directory) for incremental translation")
+    parser.add_argument("--previous-output", default=None,
+                        help="translated copies of --previous-source (file or directory)")
+    parser.add_argument("--include", action="append", default=[], metavar="PATH",
+                        help="only translate strings under this JSONPath-like pattern (repeatable)")
+    parser.add_argument("--exclude", action="append", default=[], metavar="PATH",
+                        help="skip this JSONPath-like pattern and its subtree (repeatable)")
+    parser.add_argument("--target", action="append", default=[], metavar="LANG",
+                        choices=list(translator.TARGET_LANGUAGES),
+                        help="target language (repeatable, default en); with several targets each gets "
+                             "its own subdirectory of --output-dir")
+    parser.add_argument("--glossary", default=None, help="glossary file, one 'source = target' per line")
+    parser.add_argument("--no-resume", action="store_true", help="do not journal progress for resuming")
+    parser.add_argument("--dry-run", action="store_true",
+                        help="print the projected calls, tokens, cache hit ratio and ETA without translating")
+    parser.add_argument("--report", default=None, help="write a JSON run report to this path")
+    parser.add_argument("--metrics", default=None, help="write Prometheus text metrics to this path")
+    args = parser.parse_args(argv)
+
+    files = expand_inputs(args.inputs)
+    if not files:
+        parser.error("no JSON files found")
+    if bool(args.previous_source) != bool(args.previous_output):
+        parser.error("--previous-source and --previous-output must be given together")
+    if args.previous_source and len(set(args.target)) > 1:
+        parser.error("incremental translation supports a single --target")
+    previous = find_previous(files, args.previous_source, args.previous_output) if args.previous_source else None
+
+    try:
+        rules = PathRules(args.include, args.exclude)
+    except ValueError as e:
+        parser.error(str(e))
+    glossary = None
+    if args.glossary:
+        with open(args.glossary, encoding="utf-8") as f:
+            glossary = Glossary.from_text(f.read())
+
+    if args.dry_run:
+        estimate = estimate_files(files, workers=args.workers, max_workers=args.concurrency,
+                                  protocol=get_protocol(args.protocol), previous=previous, resume=not args.no_resume,
+                                  glossary=glossary, rules=rules, languages=args.target)
+        print(json.dumps(estimate, ensure_ascii=False, indent=2))
+        return 0
+
+    metrics = RunMetrics()
+    failed_count = translate_files(files, args.output_dir, workers=args.workers, max_workers=args.concurrency,
+                                   protocol=get_protocol(args.protocol), indent=None if args.compact else args.indent,
+                                   metrics=metrics, previous=previous, resume=not args.no_resume, glossary=glossary,
+                                   rules=rules, languages=args.target)
+    if args.report:
+        with open(args.report, "w", encoding="utf-8") as f:
+            f.write(metrics.to_json())
+    if args.metrics:
+        with open(args.metrics, "w", encoding="utf-8") as f:
+            f.write(metrics.to_prometheus())
+    return 1 if failed_count else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
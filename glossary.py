@@ -0,0 +1,179 @@
+import os
+from collections import deque
+
+from cjk import CJK_PATTERN, contains_cjk
+
+# 默认术语表，与 sys_prompt 中的术语一致；每行 "中文 = 英文"，# 开头为注释
+DEFAULT_GLOSSARY = """\
+票 = invoice
+发票 = invoice
+红票 = credit invoice
+红字发票 = credit invoice
+蓝票 = invoice
+蓝字发票 = invoice
+开票项 = invoicing item
+数电票 = fully digitized e-invoice
+专票 = Special VAT Invoice
+增值税专用发票 = Special VAT Invoice
+普票 = Normal VAT Invoice
+增值税普通发票 = Normal VAT Invoice
+"""
+
+# 术语之间允许出现的全角标点及其英文写法
+PUNCTUATION = {
+    "，": ", ", "、": ", ", "；": "; ", "：": ": ", "（": " (", "）": ")", "／": "/", "　": " ",
+}
+
+
+# 解析术语表文本，返回 {中文: 英文}；格式错误的行抛出 ValueError
+def parse_glossary(text):
+    terms = {}
+    for number, line in enumerate(text.splitlines(), 1):
+        line = line.strip()
+        if not line or line.startswith("#"):
+            continue
+        source, sep, target = line.partition("=")
+        if not sep or not source.strip() or not target.strip():
+            raise ValueError(f"Invalid glossary line {number}: {line!r}")
+        terms[source.strip()] = target.strip()
+    return terms
+
+
+# 结构化术语表：用 Aho-Corasick 自动机一次扫描找出文本中所有术语
+# 文本中的中文全部被术语覆盖（术语之间只有空白、ASCII 字符或常见全角标点）时直接在本地得到译文，不再请求模型
+class Glossary:
+    def __init__(self, terms):
+        self.terms = dict(terms)
+        # 自动机的每个状态：转移表、失败指针、以该状态结尾的术语长度
+        self._goto = [{}]
+        self._fail = [0]
+        self._output = [[]]
+        for term in self.terms:
+            self._add(term)
+        self._build()
+        # 术语和可转换标点中出现过的中文字符；文本里有其他中文字符时不可能被完整覆盖，无需扫描
+        self._chars = set(CJK_PATTERN.findall("".join(self.terms) + "".join(PUNCTUATION)))
+
+    @classmethod
+    def from_text(cls, text):
+        return cls(parse_glossary(text))
+
+    def __len__(self):
+        return len(self.terms)
+
+    def _add(self, term):
+        state = 0
+        for char in term:
+            if char not in self._goto[state]:
+                self._goto.append({})
+                self._fail.append(0)
+                self._output.append([])
+                self._goto[state][char] = len(self._goto) - 1
+            state = self._goto[state][char]
+        self._output[state].append(len(term))
+
+    def _build(self):
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, child in self._goto[state].items():
+                queue.append(child)
+                fail = self._fail[state]
+                while fail and char not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[child] = self._goto[fail].get(char, 0)
+                if self._fail[child] == child:
+                    self._fail[child] = 0
+                self._output[child] = self._output[child] + self._output[self._fail[child]]
+
+    # 返回每个起始位置上能匹配的术语长度列表
+    def matches(self, text):
+        starts = [[] for _ in range(len(text))]
+        state = 0
+        for end, char in enumerate(text, 1):
+            while state and char not in self._goto[state]:
+                state = self._fail[state]
+            state = self._goto[state].get(char, 0)
+            for length in self._output[state]:
+                starts[end - length].append(length)
+        return starts
+
+    # 文本完全由术语和分隔符组成时返回译文，否则返回 None；有多种切分时优先使用较长的术语
+    def resolve(self, text):
+        if text in self.terms:
+            return self.terms[text]
+        if not self._chars.issuperset(CJK_PATTERN.findall(text)):
+            return None
+        starts = self.matches(text)
+        n = len(text)
+        # best[i]: 从位置 i 到结尾的切分方式，第一步为 ("term", 长度) 或 ("sep", 1)；None 表示无法覆盖
+        best = [None] * n + [("end", 0)]
+        for i in range(n - 1, -1, -1):
+            for length in sorted(starts[i], reverse=True):
+                if best[i + length] is not None:
+                    best[i] = ("term", length)
+                    break
+            else:
+                char = text[i]
+                if (char in PUNCTUATION or not contains_cjk(char)) and best[i + 1] is not None:
+                    best[i] = ("sep", 1)
+        if best[0] is None:
+            return None
+
+        # 按切分结果拼接译文：(片段, 类型)，类型为 term（术语译文）、punct（转换后的全角标点）或 raw（原样保留）
+        pieces = []
+        i = 0
+        while i < n:
+            kind, length = best[i]
+            piece = text[i:i + length]
+            if kind == "term":
+                pieces.append((self.terms[piece], "term"))
+            elif piece in PUNCTUATION:
+                pieces.append((PUNCTUATION[piece], "punct"))
+            else:
+                pieces.append((piece, "raw"))
+            i += length
+        if all(kind != "term" for _, kind in pieces):
+            return None
+
+        parts = []
+        previous_kind = None
+        for index, (piece, kind) in enumerate(pieces):
+            if kind == "punct":
+                # 转换出的空格不出现在文本首尾，也不与原有空格重复
+                if index == 0 or parts[-1][-1:].isspace():
+                    piece = piece.lstrip()
+                if index == len(pieces) - 1:
+                    piece = piece.rstrip()
+            elif previous_kind == "punct" and parts[-1][-1:].isspace():
+                piece = piece.lstrip()
+                if not piece:
+                    continue
+            if parts and "term" in (kind, previous_kind) and parts[-1][-1:].isalnum() and piece[:1].isalnum():
+                # 相邻的术语之间、术语与英文或数字之间补空格
+                parts.append(" ")
+            parts.append(piece)
+            previous_kind = kind
+        return "".join(parts)
+
+    # 批量解析，返回 {原文: 译文}，只包含能在本地解析的文本
+    def resolve_many(self, texts):
+        resolved = {}
+        for text in texts:
+            translation = self.resolve(text)
+            if translation is not None:
+                resolved[text] = translation
+        return resolved
+
+
+# 默认术语表文本，环境变量 TRANSLATE_GLOSSARY_PATH 指向的文件优先
+def default_glossary_text():
+    path = os.environ.get("TRANSLATE_GLOSSARY_PATH")
+    if path:
+        with open(path, encoding="utf-8") as f:
+            return f.read()
+    return DEFAULT_GLOSSARY
+
+
+def load_default_glossary():
+    return Glossary.from_text(default_glossary_text())
@@ -0,0 +1,79 @@
+import hashlib
+import json
+import logging
+import os
+
+# 任务日志目录，可通过环境变量调整
+DEFAULT_DIR = os.environ.get("TRANSLATE_JOURNAL_DIR", os.path.join(".cache", "jobs"))
+
+
+# 分块计算文件内容的哈希，读完后回到文件开头
+def file_digest(stream, chunk_size=1 << 20):
+    digest = hashlib.sha256()
+    for chunk in iter(lambda: stream.read(chunk_size), b""):
+        digest.update(chunk)
+    stream.seek(0)
+    return digest.hexdigest()
+
+
+# 任务 ID：由文件内容哈希、提示词和模型共同决定，同一文件用同一提示词重新提交时得到同一个 ID
+def job_id(content_digest, sys_prompt, model):
+    return hashlib.sha256(f"{content_digest}\0{sys_prompt}\0{model}".encode("utf-8")).hexdigest()
+
+
+# 断点续传日志：每完成一个批次就把 {原文: 译文} 作为一行追加到磁盘，任务中断后用同一 ID 重新运行时跳过已完成的文本
+# 与翻译记忆不同，日志只属于一个任务，不受容量淘汰、use_memory 开关和缓存清除的影响，任务成功结束后删除
+# 只在处理结果的线程（translate_text 的调用线程）中写入
+class JobJournal:
+    def __init__(self, path):
+        self.path = path
+        self.completed = self._load()
+        self._file = None
+
+    @classmethod
+    def for_job(cls, job, directory=DEFAULT_DIR):
+        return cls(os.path.join(directory, f"{job}.jsonl"))
+
+    # 读取已完成的批次；进程在写入途中退出时最后一行可能不完整，跳过即可
+    def _load(self):
+        completed = {}
+        if not os.path.exists(self.path):
+            return completed
+        with open(self.path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    completed.update(json.loads(line))
+                except ValueError:
+                    logging.warning(f"Skipping truncated journal line in {self.path}")
+        return completed
+
+    # 记录一个批次的结果并立即落盘
+    def record(self, translations):
+        if not translations:
+            return
+        if self._file is None:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            self._file = open(self.path, "a", encoding="utf-8")
+            # 上次中断留下的残行不以换行结尾，先补上换行，避免和新记录拼成一行
+            if self._file.tell() and not self._ends_with_newline():
+                self._file.write("\n")
+        self._file.write(json.dumps(translations, ensure_ascii=False) + "\n")
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self.completed.update(translations)
+
+    def _ends_with_newline(self):
+        with open(self.path, "rb") as f:
+            f.seek(-1, os.SEEK_END)
+            return f.read(1) == b"\n"
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    # 任务完成：删除日志
+    def finish(self):
+        self.close()
+        if os.path.exists(self.path):
+            os.remove(self.path)
@@ -0,0 +1,223 @@
+import hashlib
+import io
+import json
+import logging
+import os
+import re
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+import translator
+from job_journal import file_digest
+from run_metrics import RunMetrics
+from translation_memory import prompt_hash
+
+# 后台任务的工作线程数（所有会话共用）、结果缓存位置和容量、已结束任务在内存中保留的时间（秒），可通过环境变量调整
+JOB_WORKERS = int(os.environ.get("TRANSLATE_JOB_WORKERS", 2))
+RESULT_CACHE_DIR = os.environ.get("TRANSLATE_RESULT_CACHE_DIR", os.path.join(".cache", "results"))
+RESULT_CACHE_MAX_FILES = int(os.environ.get("TRANSLATE_RESULT_CACHE_MAX_FILES", 200))
+JOB_RETENTION = float(os.environ.get("TRANSLATE_JOB_RETENTION", 3600))
+
+QUEUED, RUNNING, DONE, FAILED = "queued", "running", "done", "failed"
+
+# 缓存中的结果文件名：<键>.json 或 <键>.zip；任务的临时文件 job-<id>.tmp.* 不属于缓存
+_CACHED_NAME = re.compile(r"[0-9a-f]{64}\.(?:json|zip)")
+
+
+# 代替 Streamlit 的 st.empty()：翻译函数写入的进度保存在这里，由页面轮询显示
+class JobLog:
+    def __init__(self):
+        self.message = ""
+        self.warnings = []
+
+    def markdown(self, text, **kwargs):
+        self.message = text
+
+    def warning(self, text):
+        self.warnings.append(text)
+
+
+class Job:
+    def __init__(self, key, name):
+        self.id = uuid.uuid4().hex
+        self.key = key
+        self.name = name
+        self.status = QUEUED
+        self.log = JobLog()
+        self.failures = []
+        self.metrics = None
+        self.result_path = None
+        self.cached = False
+        self.error = None
+        self.submitted = time.time()
+        self.finished = None
+
+    @property
+    def done(self):
+        return self.status in (DONE, FAILED)
+
+
+# 结果缓存的键：文件内容、提示词、模型，以及其他会改变输出的选项（术语表、流式模式、输出缩进、增量翻译的上一版文件、路径规则、
+# 多语言任务的目标语言）
+def result_key(data, prompt, model, glossary=None, streaming=False, previous=None, indent=4, rules=None,
+               languages=None):
+    parts = [file_digest(io.BytesIO(data)), prompt_hash(prompt), model,
+             "streaming" if streaming else f"indent={indent}"]
+    if glossary is not None:
+        parts.append(json.dumps(sorted(glossary.terms.items()), ensure_ascii=False))
+    if previous:
+        parts.extend(file_digest(io.BytesIO(content)) for content in previous)
+    if rules:
+        parts.append(json.dumps(rules.patterns))
+    if languages:
+        parts.append("languages=" + ",".join(languages))
+    return hashlib.sha256("\0".join(parts).encode("utf-8")).hexdigest()
+
+
+# 翻译结果的磁盘缓存，每个结果一个文件（单语言为 .json，多语言为 .zip），超出容量时删除最久未使用的
+class ResultCache:
+    def __init__(self, directory=RESULT_CACHE_DIR, max_files=RESULT_CACHE_MAX_FILES):
+        self.directory = directory
+        self.max_files = max_files
+        self._lock = threading.Lock()
+
+    def path(self, key, suffix=".json"):
+        return os.path.join(self.directory, f"{key}{suffix}")
+
+    # 命中时返回结果文件路径并刷新其使用时间
+    def get(self, key, suffix=".json"):
+        path = self.path(key, suffix)
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            return None
+        return path
+
+    # 把已写好的结果文件移入缓存，返回缓存中的路径
+    def put_file(self, key, source_path, suffix=".json"):
+        path = self.path(key, suffix)
+        os.replace(source_path, path)
+        self._evict()
+        return path
+
+    def _evict(self):
+        with self._lock:
+            entries = [entry for entry in os.scandir(self.directory) if _CACHED_NAME.fullmatch(entry.name)]
+            if len(entries) <= self.max_files:
+                return
+            entries.sort(key=lambda entry: entry.stat().st_mtime)
+            for entry in entries[:len(entries) - self.max_files]:
+                os.remove(entry.path)
+
+
+# 后台翻译任务：所有会话共用一个工作线程池；相同输入的任务只执行一次，已完成的结果直接从缓存返回
+# 有未翻译条目的结果不进入缓存，以 retry=True 重新提交时会重新翻译（已翻译的条目由翻译记忆直接命中）
+class JobManager:
+    def __init__(self, workers=JOB_WORKERS, cache=None):
+        self.cache = cache or ResultCache()
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="translate-job")
+        self._jobs = {}
+        self._by_key = {}
+        self._lock = threading.Lock()
+
+    # 提交任务并返回 Job；同一输入已有排队、运行中或已完成的任务时直接返回它，
+    # retry 为 True 时忽略失败或有未翻译条目的旧任务
+    # indent 为 None 时输出紧凑格式，流式模式保留原文件格式；rules 为 PathRules（流式模式不支持）
+    # languages 为目标语言列表：只有一种时按该语言的提示词和术语表翻译；多于一种时结果为每种语言一个文件的 zip，
+    # 此时不支持流式模式和增量翻译；prompt 只用于英文
+    def submit(self, data, name, prompt=None, protocol=None, max_workers=None, glossary=None, streaming=False,
+               previous=None, retry=False, indent=4, rules=None, languages=None):
+        languages = list(dict.fromkeys(languages or ["en"]))
+        if len(languages) == 1:
+            prompt = translator.language_prompt(languages[0], prompt)
+            glossary = translator.language_glossary(languages[0], glossary)
+            languages = None
+        else:
+            prompt = prompt or translator.sys_prompt
+            streaming, previous = False, None
+        rules = None if streaming else rules
+        suffix = ".zip" if languages else ".json"
+        key = result_key(data, prompt, translator.provider.model, glossary, streaming, previous, indent, rules,
+                         languages)
+        with self._lock:
+            self._purge()
+            job = self._by_key.get(key)
+            # 结果文件已被缓存淘汰的任务视为不存在
+            if job is not None and job.status == DONE and not os.path.exists(job.result_path):
+                job = None
+            if job is not None and not (retry and (job.status == FAILED or (job.status == DONE and job.failures))):
+                return job
+
+            job = Job(key, name)
+            cached_path = self.cache.get(key, suffix)
+            if cached_path:
+                job.status, job.result_path, job.cached, job.finished = DONE, cached_path, True, time.time()
+                logging.info(f"Result cache hit for {name}")
+            else:
+                self._executor.submit(self._run, job, data, prompt, protocol, max_workers, glossary, streaming,
+                                      previous, indent, rules, languages)
+            self._jobs[job.id] = job
+            self._by_key[key] = job
+            return job
+
+    def get(self, job_id):
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    # 结果直接写入任务自己的临时文件，成功后移入缓存，不在内存中保留完整副本
+    def _run(self, job, data, prompt, protocol, max_workers, glossary, streaming, previous, indent, rules, languages):
+        job.status = RUNNING
+        job.metrics = RunMetrics()
+        os.makedirs(self.cache.directory, exist_ok=True)
+        suffix = ".zip" if languages else ".json"
+        output_path = os.path.join(self.cache.directory, f"job-{job.id}.tmp{suffix}")
+        try:
+            if streaming:
+                translator.translate_and_save_json_streaming(
+                    io.BytesIO(data), job.log, max_workers=max_workers, output_path=output_path, protocol=protocol,
+                    prompt=prompt, metrics=job.metrics, glossary=glossary, failures=job.failures)
+            else:
+                previous_files = tuple(io.BytesIO(content) for content in previous) if previous else None
+                translator.translate_and_save_json(
+                    io.BytesIO(data), job.log, max_workers=max_workers, failures=job.failures, protocol=protocol,
+                    prompt=prompt, metrics=job.metrics, previous_files=previous_files, glossary=glossary,
+                    output_path=output_path, indent=indent, rules=rules, languages=languages)
+
+            if job.failures:
+                job.result_path = output_path
+            else:
+                job.result_path = self.cache.put_file(job.key, output_path, suffix)
+            job.status = DONE
+        except Exception as exc:
+            logging.exception(f"Job {job.id} ({job.name}) failed")
+            job.error = exc
+            job.status = FAILED
+        finally:
+            job.finished = time.time()
+
+    # 清理结束超过 JOB_RETENTION 秒的任务及其未缓存的结果文件
+    def _purge(self):
+        now = time.time()
+        for job in list(self._jobs.values()):
+            if job.finished and now - job.finished > JOB_RETENTION:
+                del self._jobs[job.id]
+                if self._by_key.get(job.key) is job:
+                    del self._by_key[job.key]
+                if job.result_path and os.path.basename(job.result_path).startswith("job-") \
+                        and os.path.exists(job.result_path):
+                    os.remove(job.result_path)
+
+
+_manager = None
+_manager_lock = threading.Lock()
+
+
+# 进程内唯一的任务管理器，Streamlit 的多次重跑和多个会话共用
+def get_job_manager():
+    global _manager
+    with _manager_lock:
+        if _manager is None:
+            _manager = JobManager()
+        return _manager
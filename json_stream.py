@@ -0,0 +1,122 @@
+import json
+import re
+
+from cjk import contains_cjk
+
+# 每次从输入读取的字符数
+CHUNK_SIZE = 1 << 16
+
+# 需要关注的 JSON 结构字符；其余内容（空白、数字、true/false/null）原样输出
+_SIGNIFICANT = re.compile(r'["{}\[\],:]')
+# 完整的 JSON 字符串字面量；字符串跨越读取块边界时匹配失败，需要继续读取
+_STRING = re.compile(r'"[^"\\]*(?:\\.[^"\\]*)*"', re.DOTALL)
+
+
+# 输出缓冲：原样内容和待翻译的字符串按顺序排列，凑满一个窗口后统一翻译并写出
+class _WindowedWriter:
+    def __init__(self, writer, translate_fn, window_size, max_buffer_chars):
+        self.writer = writer
+        self.translate_fn = translate_fn
+        self.window_size = window_size
+        self.max_buffer_chars = max_buffer_chars
+        self.pieces = []
+        self.pending = []  # (pieces 中的下标, 原文)
+        self.buffered_chars = 0
+        self.translated_count = 0
+
+    def write_raw(self, text):
+        if not text:
+            return
+        if not self.pending:
+            self.writer.write(text)
+            return
+        self.pieces.append(text)
+        self.buffered_chars += len(text)
+        # 待翻译文本很稀疏时，避免原样内容在内存中无限堆积
+        if self.buffered_chars >= self.max_buffer_chars:
+            self.flush()
+
+    def write_value(self, text):
+        self.pending.append((len(self.pieces), text))
+        self.pieces.append(None)
+        self.buffered_chars += len(text)
+        if len(self.pending) >= self.window_size or self.buffered_chars >= self.max_buffer_chars:
+            self.flush()
+
+    def flush(self):
+        if self.pending:
+            # 窗口内去重后再翻译
+            unique_texts = list(dict.fromkeys(text for _, text in self.pending))
+            translation_map = dict(zip(unique_texts, self.translate_fn(unique_texts)))
+            for index, text in self.pending:
+                self.pieces[index] = json.dumps(translation_map[text], ensure_ascii=False)
+            self.translated_count += len(self.pending)
+        self.writer.write("".join(self.pieces))
+        self.pieces = []
+        self.pending = []
+        self.buffered_chars = 0
+
+
+# 流式翻译：增量读取 JSON 文本，按窗口批量翻译含中文的字符串值并边读边写，内存占用与文件大小无关
+# 对象的键和不含中文的内容原样保留（包括原文件的缩进格式）；返回翻译的字符串个数
+def stream_translate(reader, writer, translate_fn, window_size=1000, max_buffer_chars=1 << 22,
+                     chunk_size=CHUNK_SIZE):
+    out = _WindowedWriter(writer, translate_fn, window_size, max_buffer_chars)
+    buf = ""
+    pos = 0        # 扫描位置
+    raw_start = 0  # 尚未写出的原样内容起点
+    eof = False
+    stack = []     # 当前所在的容器，'{' 或 '['
+    expect_key = False
+
+    while True:
+        match = _SIGNIFICANT.search(buf, pos)
+        string_match = None
+        if match is not None and match.group() == '"':
+            string_match = _STRING.match(buf, match.start())
+            if string_match is None and eof:
+                raise ValueError(f"Unterminated JSON string near: {buf[match.start():match.start() + 80]!r}")
+
+        if match is None or (match.group() == '"' and string_match is None):
+            # 缓冲区里没有完整的记号：写出已扫描的部分，保留未完成的字符串，再读取下一块
+            keep_from = len(buf) if match is None else match.start()
+            out.write_raw(buf[raw_start:keep_from])
+            buf = buf[keep_from:]
+            pos = raw_start = 0
+            if eof:
+                break
+            # 超长字符串跨越多个块时按缓冲区大小成倍读取，避免反复从头匹配
+            chunk = reader.read(max(chunk_size, len(buf)))
+            if chunk:
+                buf += chunk
+            else:
+                eof = True
+            continue
+
+        token = match.group()
+        pos = match.end()
+        if token == '"':
+            pos = string_match.end()
+            if not (stack and stack[-1] == '{' and expect_key):
+                raw = string_match.group()
+                text = json.loads(raw) if '\\' in raw else raw[1:-1]
+                if contains_cjk(text):
+                    out.write_raw(buf[raw_start:match.start()])
+                    out.write_value(text)
+                    raw_start = pos
+        elif token == '{':
+            stack.append(token)
+            expect_key = True
+        elif token == '[':
+            stack.append(token)
+            expect_key = False
+        elif token in '}]':
+            stack.pop()
+            expect_key = False
+        elif token == ',':
+            expect_key = bool(stack) and stack[-1] == '{'
+        else:  # ':'
+            expect_key = False
+
+    out.flush()
+    return out.translated_count
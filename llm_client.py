@@ -0,0 +1,307 @@
+import asyncio
+import importlib
+import logging
+import os
+import threading
+import time
+import weakref
+from collections import deque, namedtuple
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from dotenv import load_dotenv
+
+load_dotenv(override=True)
+
+# 连接池大小和空闲连接保持时间，可通过环境变量调整
+HTTP_MAX_CONNECTIONS = int(os.environ.get("HTTP_MAX_CONNECTIONS", 32))
+HTTP_KEEPALIVE_EXPIRY = float(os.environ.get("HTTP_KEEPALIVE_EXPIRY", 120))
+
+# 多服务商调度：连续失败 FAILURE_THRESHOLD 次的服务商暂停使用 FAILURE_COOLDOWN 秒；
+# 请求耗时超过主服务商延迟的 HEDGE_PERCENTILE 分位时向下一个服务商发送对冲请求，对冲请求数不超过总请求数的 HEDGE_BUDGET
+FAILURE_THRESHOLD = int(os.environ.get("LLM_FAILURE_THRESHOLD", 3))
+FAILURE_COOLDOWN = float(os.environ.get("LLM_FAILURE_COOLDOWN", 30))
+HEDGE_PERCENTILE = float(os.environ.get("LLM_HEDGE_PERCENTILE", 0.95))
+HEDGE_BUDGET = float(os.environ.get("LLM_HEDGE_BUDGET", 0.1))
+HEDGE_MIN_SAMPLES = 20
+
+# 一次补全调用的结果；服务商没有返回用量时 token 数为 0
+Completion = namedtuple("Completion", ["content", "prompt_tokens", "completion_tokens"])
+
+
+def _to_completion(response):
+    usage = getattr(response, "usage", None)
+    return Completion(response.choices[0].message.content,
+                      getattr(usage, "prompt_tokens", 0) or 0,
+                      getattr(usage, "completion_tokens", 0) or 0)
+
+
+# 兼容 OpenAI 接口的服务商（OpenAI、Azure OpenAI、Groq）
+# SDK 和客户端都在第一次调用时才导入、创建；同步调用共用一个带 keep-alive 的连接池，异步调用每个事件循环一个连接池
+class OpenAICompatibleProvider:
+    def __init__(self, name, model, sdk_name, client_class, async_client_class, **client_kwargs):
+        self.name = name
+        self.model = model
+        self._sdk_name = sdk_name
+        self._client_class = client_class
+        self._async_client_class = async_client_class
+        self._client_kwargs = client_kwargs
+        self._client = None
+        self._async_clients = weakref.WeakKeyDictionary()
+        self._lock = threading.Lock()
+
+    def _limits(self, sdk):
+        return type(sdk.DEFAULT_CONNECTION_LIMITS)(
+            max_connections=HTTP_MAX_CONNECTIONS,
+            max_keepalive_connections=HTTP_MAX_CONNECTIONS,
+            keepalive_expiry=HTTP_KEEPALIVE_EXPIRY,
+        )
+
+    @property
+    def client(self):
+        with self._lock:
+            if self._client is None:
+                sdk = importlib.import_module(self._sdk_name)
+                http_client = sdk.DefaultHttpxClient(limits=self._limits(sdk))
+                self._client = getattr(sdk, self._client_class)(http_client=http_client, **self._client_kwargs)
+            return self._client
+
+    @property
+    def async_client(self):
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            if loop not in self._async_clients:
+                sdk = importlib.import_module(self._sdk_name)
+                http_client = sdk.DefaultAsyncHttpxClient(limits=self._limits(sdk))
+                self._async_clients[loop] = getattr(sdk, self._async_client_class)(http_client=http_client,
+                                                                                   **self._client_kwargs)
+            return self._async_clients[loop]
+
+    def complete(self, messages, **options):
+        response = self.client.chat.completions.create(model=self.model, messages=messages, **options)
+        return _to_completion(response)
+
+    async def acomplete(self, messages, **options):
+        response = await self.async_client.chat.completions.create(model=self.model, messages=messages, **options)
+        return _to_completion(response)
+
+    def close(self):
+        with self._lock:
+            if self._client is not None:
+                self._client.close()
+                self._client = None
+            # 异步客户端随各自的事件循环结束，这里只丢弃引用
+            self._async_clients.clear()
+
+
+# 单个服务商的健康状况：最近的请求延迟和连续失败次数
+class ProviderHealth:
+    def __init__(self, window=200):
+        self.latencies = deque(maxlen=window)
+        self.successes = 0
+        self.failures = 0
+        self.consecutive_failures = 0
+        self.unavailable_until = 0.0
+        self._lock = threading.Lock()
+
+    def record_success(self, latency):
+        with self._lock:
+            self.latencies.append(latency)
+            self.successes += 1
+            self.consecutive_failures = 0
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            self.consecutive_failures += 1
+            if self.consecutive_failures >= FAILURE_THRESHOLD:
+                self.unavailable_until = time.monotonic() + FAILURE_COOLDOWN
+
+    def available(self):
+        return time.monotonic() >= self.unavailable_until
+
+    # 延迟的 q 分位数；样本不足时返回 None
+    def percentile(self, q):
+        with self._lock:
+            if len(self.latencies) < HEDGE_MIN_SAMPLES:
+                return None
+            ordered = sorted(self.latencies)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+# 多服务商调度器，接口与单个服务商相同，可直接替换 translator.provider
+# 按配置顺序优先使用排在前面的健康服务商，出错时依次换下一个；开启对冲时，请求超过主服务商延迟分位数仍未返回，
+# 就向下一个服务商再发一份，取先成功的结果（同步请求无法中途取消，落后的请求在后台完成后只用于更新健康状况）
+# 翻译记忆和分批器按第一个服务商的模型区分
+class ProviderDispatcher:
+    def __init__(self, providers, hedge_percentile=HEDGE_PERCENTILE, hedge_budget=HEDGE_BUDGET):
+        self.providers = list(providers)
+        self.health = {provider: ProviderHealth() for provider in self.providers}
+        self.hedge_percentile = hedge_percentile
+        self.hedge_budget = hedge_budget
+        self.name = "+".join(provider.name for provider in self.providers)
+        self.model = self.providers[0].model
+        self.requests = 0
+        self.hedges = 0
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=2 * HTTP_MAX_CONNECTIONS, thread_name_prefix="llm-dispatch")
+
+    # 本次请求依次尝试的服务商：可用的在前，全部暂停时仍按原顺序尝试
+    def _candidates(self):
+        available = [provider for provider in self.providers if self.health[provider].available()]
+        return available + [provider for provider in self.providers if provider not in available]
+
+    def _hedge_delay(self, provider):
+        if not self.hedge_percentile or len(self.providers) < 2:
+            return None
+        with self._lock:
+            if self.hedges >= self.hedge_budget * self.requests:
+                return None
+        return self.health[provider].percentile(self.hedge_percentile)
+
+    def _call(self, provider, messages, options):
+        started = time.perf_counter()
+        try:
+            completion = provider.complete(messages, **options)
+        except Exception:
+            self.health[provider].record_failure()
+            raise
+        self.health[provider].record_success(time.perf_counter() - started)
+        return completion
+
+    def complete(self, messages, **options):
+        with self._lock:
+            self.requests += 1
+        candidates = deque(self._candidates())
+        futures = {}
+        error = None
+        while candidates or futures:
+            if not futures:
+                provider = candidates.popleft()
+                futures[self._executor.submit(self._call, provider, messages, options)] = provider
+            timeout = self._hedge_delay(next(iter(futures.values()))) if len(futures) == 1 and candidates else None
+            finished, _ = wait(futures, timeout=timeout, return_when=FIRST_COMPLETED)
+            if not finished:
+                # 超过延迟分位数仍未返回，向下一个服务商发送对冲请求
+                provider = candidates.popleft()
+                with self._lock:
+                    self.hedges += 1
+                logging.info(f"Hedging request to {provider.name} after {timeout:.2f}s")
+                futures[self._executor.submit(self._call, provider, messages, options)] = provider
+                continue
+            for future in finished:
+                provider = futures.pop(future)
+                try:
+                    return future.result()
+                except Exception as exc:
+                    logging.warning(f"Provider {provider.name} failed: {exc!r}")
+                    error = exc
+        raise error
+
+    async def _acall(self, provider, messages, options):
+        started = time.perf_counter()
+        try:
+            completion = await provider.acomplete(messages, **options)
+        except Exception:
+            self.health[provider].record_failure()
+            raise
+        self.health[provider].record_success(time.perf_counter() - started)
+        return completion
+
+    # 异步版本，落后的对冲请求会被取消
+    async def acomplete(self, messages, **options):
+        with self._lock:
+            self.requests += 1
+        candidates = deque(self._candidates())
+        tasks = {}
+        error = None
+        try:
+            while candidates or tasks:
+                if not tasks:
+                    provider = candidates.popleft()
+                    tasks[asyncio.ensure_future(self._acall(provider, messages, options))] = provider
+                timeout = self._hedge_delay(next(iter(tasks.values()))) if len(tasks) == 1 and candidates else None
+                finished, _ = await asyncio.wait(tasks, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+                if not finished:
+                    provider = candidates.popleft()
+                    with self._lock:
+                        self.hedges += 1
+                    logging.info(f"Hedging request to {provider.name} after {timeout:.2f}s")
+                    tasks[asyncio.ensure_future(self._acall(provider, messages, options))] = provider
+                    continue
+                for task in finished:
+                    provider = tasks.pop(task)
+                    try:
+                        return task.result()
+                    except Exception as exc:
+                        logging.warning(f"Provider {provider.name} failed: {exc!r}")
+                        error = exc
+            raise error
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    def close(self):
+        self._executor.shutdown(wait=False)
+        for provider in self.providers:
+            provider.close()
+
+
+def _azure_provider():
+    return OpenAICompatibleProvider(
+        "azure", os.environ['OPENAI_GPT4OMIN_DEPLOYMENT_NAME'], "openai", "AzureOpenAI", "AsyncAzureOpenAI",
+        api_key=os.environ['AZURE_OPENAI_GPT4oMINI_API_KEY'],
+        api_version=os.environ['OPENAI_API_GPT4oMINI_VERSION'],
+        azure_endpoint=os.environ['AZURE_OPENAI_GPT4oMINI_ENDPOINT'],
+    )
+
+
+def _openai_provider():
+    return OpenAICompatibleProvider("openai", "gpt-4o-mini", "openai", "OpenAI", "AsyncOpenAI",
+                                    api_key=os.environ.get("OPENAI_API_KEY"))
+
+
+def _groq_provider():
+    return OpenAICompatibleProvider("groq", "llama-3.1-70b-versatile", "groq", "Groq", "AsyncGroq",
+                                    api_key=os.environ.get("GROQ_API_KEY"))
+
+
+# 离线模拟服务商，参数见 mock_provider.mock_provider_from_env
+def _mock_provider():
+    from mock_provider import mock_provider_from_env
+    return mock_provider_from_env()
+
+
+# 服务商名称 -> 构造函数；未配置 LLM_PROVIDER 时使用 groq
+# LLM_PROVIDER 可以是逗号分隔的多个名称（例如 "groq,azure"），此时返回按该顺序故障转移的 ProviderDispatcher
+PROVIDER_FACTORIES = {
+    "azure": _azure_provider,
+    "openai": _openai_provider,
+    "groq": _groq_provider,
+    "mock": _mock_provider,
+}
+
+_providers = {}
+_providers_lock = threading.Lock()
+
+
+# 获取服务商实例，同一进程内（包括 Streamlit 的多次重跑和多个线程）共用同一个实例及其连接池
+def get_provider(name=None):
+    name = name or os.environ.get("LLM_PROVIDER") or "groq"
+    names = [part.strip() for part in name.split(",") if part.strip()]
+    if len(names) > 1:
+        key = ",".join(names)
+        providers = [_get_single_provider(n) for n in names]
+        with _providers_lock:
+            if key not in _providers:
+                _providers[key] = ProviderDispatcher(providers)
+            return _providers[key]
+    return _get_single_provider(names[0] if names else "groq")
+
+
+def _get_single_provider(name):
+    if name not in PROVIDER_FACTORIES:
+        name = "groq"
+    with _providers_lock:
+        if name not in _providers:
+            _providers[name] = PROVIDER_FACTORIES[name]()
+        return _providers[name]
@@ -0,0 +1,83 @@
+import os
+import re
+
+from cjk import CJK_RANGES
+
+# 数字至少有这么多个字符才替换为占位符，更短的数字替换后反而更长；可通过环境变量调整
+MASK_MIN_NUMBER_LENGTH = int(os.environ.get("TRANSLATE_MASK_MIN_NUMBER_LENGTH", 3))
+
+# 不需要翻译的片段，按优先级排列：行内代码、HTML/XML 标签、URL、邮箱、格式化占位符、字段名（含下划线或点的标识符、驼峰式）、数字
+# 格式化占位符（包括与本模块占位符形式相同的 {0}）总是被替换，因此替换后文本中的 {数字} 一定是本模块生成的占位符
+# 行内代码、标签和 URL 不能包含中文：中文文本中 URL 后面通常不加空格，含中文的代码和标签属性也需要翻译
+_NOT_WORD = r"(?<![A-Za-z0-9_])"
+_END_WORD = r"(?![A-Za-z0-9_])"
+MASK_PATTERN = re.compile("|".join([
+    f"`[^`\n{CJK_RANGES}]+`",
+    f"</?[A-Za-z][A-Za-z0-9:-]*(?:\\s[^<>{CJK_RANGES}]*)?/?>",
+    f"https?://[^\\s<>\"'\u3000{CJK_RANGES}\uff00-\uffef]*[^\\s<>\"'\u3000{CJK_RANGES}\uff00-\uffef.,;:!?)]",
+    _NOT_WORD + r"[A-Za-z0-9._%+-]+@[A-Za-z0-9-]+(?:\.[A-Za-z0-9-]+)+" + _END_WORD,
+    r"%(?:\(\w+\))?[-+ #0]*\d*(?:\.\d+)?[sdfiuxXoeEgGcr]",
+    r"\{\{[^{}\n]*\}\}|\$\{[^{}\n]*\}|\{[A-Za-z0-9_.\[\]:!]*\}",
+    _NOT_WORD + r"(?:[A-Za-z_][A-Za-z0-9]*(?:[_.][A-Za-z0-9]+)+|[a-z]+[A-Z][A-Za-z0-9]*)" + _END_WORD,
+    r"(?P<number>" + _NOT_WORD + r"\d+(?:[.,:]\d+)*%?)",
+]))
+PLACEHOLDER = re.compile(r"\{(\d+)\}")
+
+
+# 把文本中不需要翻译的片段替换为 {0}、{1} ...，返回 (替换后的文本, 片段列表)；同一片段在文本中重复出现时使用同一个占位符
+# 只有数字不同的文本（例如 "第 123 页" 和 "第 456 页"）替换后相同，只需翻译一次
+def mask(text, min_number_length=None):
+    min_number_length = min_number_length or MASK_MIN_NUMBER_LENGTH
+    spans = []
+
+    def replace(match):
+        span = match.group()
+        if match.group("number") and len(span) < min_number_length:
+            return span
+        if span not in spans:
+            spans.append(span)
+        return "{%d}" % spans.index(span)
+
+    return MASK_PATTERN.sub(replace, text), spans
+
+
+# 把译文中的占位符换回原始片段
+def unmask(text, spans):
+    if not spans:
+        return text
+    return PLACEHOLDER.sub(lambda match: spans[int(match.group(1))] if int(match.group(1)) < len(spans)
+                           else match.group(), text)
+
+
+# 译文中的占位符与原文完全一致（不多不少，可以调整顺序）时返回 True；模型丢失或编造了占位符的条目需要重试
+def placeholders_intact(source, translated):
+    if "{" not in source and "{" not in translated:
+        return True
+    return set(PLACEHOLDER.findall(source)) == set(PLACEHOLDER.findall(translated))
+
+
+# 一组文本的替换计划：units 是替换后实际要翻译的文本（已去重），restore 把译文还原并与原文一一对应
+# keep 中的文本不做替换（例如能被术语表完整解析的文本）
+class MaskPlan:
+    def __init__(self, texts, keep=(), min_number_length=None):
+        self.texts = texts
+        self.layout = []  # 每个文本：(units 下标, 片段列表)
+        index = {}
+        for text in texts:
+            masked, spans = (text, []) if text in keep else mask(text, min_number_length)
+            self.layout.append((index.setdefault(masked, len(index)), spans))
+        self.units = list(index)
+
+    # translated_units 与 units 一一对应，failed_units 为翻译失败的 units 下标
+    # 返回 (与 texts 一一对应的译文, 失败的 texts 下标)；失败的文本保留原文
+    def restore(self, translated_units, failed_units=()):
+        failed_units = set(failed_units)
+        translated = []
+        failed = []
+        for i, (unit, spans) in enumerate(self.layout):
+            if unit in failed_units:
+                translated.append(self.texts[i])
+                failed.append(i)
+            else:
+                translated.append(unmask(translated_units[unit], spans))
+        return translated, failed
@@ -0,0 +1,91 @@
+import asyncio
+import json
+import os
+import random
+import threading
+import time
+
+from batch_protocol import JsonProtocol, SplitTagProtocol
+from batching import estimate_output_tokens, estimate_tokens
+from cjk import CJK_PATTERN
+from llm_client import Completion
+
+
+class MockProviderError(Exception):
+    pass
+
+
+# 离线模拟服务商，接口与 OpenAICompatibleProvider 相同，用于基准测试和无网络环境下的测试
+# latency/jitter 为每次调用的基础延迟和随机抖动（秒）；error_rate 为调用抛出异常的概率；
+# corruption_rate 为每个条目被破坏的概率（分隔符协议丢掉该条目前的分隔符，JSON 协议丢掉该条目），批次越大越容易失配
+class MockProvider:
+    def __init__(self, model="mock-model", latency=0.0, jitter=0.0, error_rate=0.0, corruption_rate=0.0, seed=None):
+        self.name = "mock"
+        self.model = model
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.corruption_rate = corruption_rate
+        self.split_tag = SplitTagProtocol().split_tag
+        self.calls = 0
+        self.errors = 0
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def _delay(self):
+        with self._lock:
+            return self.latency + self._random.uniform(0, self.jitter)
+
+    def _roll(self, rate):
+        with self._lock:
+            return self._random.random() < rate
+
+    # 模拟翻译：每个中文字符替换为 "en"，其余内容原样保留
+    @staticmethod
+    def translate(text):
+        return CJK_PATTERN.sub("en", text)
+
+    def _respond(self, messages, options):
+        with self._lock:
+            self.calls += 1
+        if self._roll(self.error_rate):
+            with self._lock:
+                self.errors += 1
+            raise MockProviderError("Simulated provider error")
+
+        content = messages[-1]["content"]
+        json_mode = (options.get("response_format", {}).get("type") == "json_object"
+                     or messages[0]["content"].endswith(JsonProtocol.instruction))
+        if json_mode:
+            items = {key: self.translate(value) for key, value in json.loads(content).items()
+                     if not self._roll(self.corruption_rate)}
+            output = json.dumps(items, ensure_ascii=False)
+        else:
+            parts = [self.translate(part) for part in content.split(self.split_tag)]
+            output = parts[0]
+            for part in parts[1:]:
+                output += ("\n" if self._roll(self.corruption_rate) else self.split_tag) + part
+
+        prompt_tokens = sum(estimate_tokens(message["content"]) for message in messages)
+        return Completion(output, prompt_tokens, estimate_output_tokens(output))
+
+    def complete(self, messages, **options):
+        time.sleep(self._delay())
+        return self._respond(messages, options)
+
+    async def acomplete(self, messages, **options):
+        await asyncio.sleep(self._delay())
+        return self._respond(messages, options)
+
+    def close(self):
+        pass
+
+
+# 按环境变量 MOCK_LATENCY、MOCK_JITTER、MOCK_ERROR_RATE、MOCK_CORRUPTION_RATE 创建模拟服务商
+def mock_provider_from_env():
+    return MockProvider(
+        latency=float(os.environ.get("MOCK_LATENCY", 0.2)),
+        jitter=float(os.environ.get("MOCK_JITTER", 0.1)),
+        error_rate=float(os.environ.get("MOCK_ERROR_RATE", 0)),
+        corruption_rate=float(os.environ.get("MOCK_CORRUPTION_RATE", 0)),
+    )
@@ -0,0 +1,143 @@
+import re
+from fnmatch import fnmatchcase
+from functools import lru_cache
+
+# 路径规则语法（JSONPath 的子集）：
+#   $.paths.*.summary    从根开始的路径，* 匹配任意一层的键或下标
+#   $..examples          .. 匹配任意多层（包括零层）
+#   $.tags[0].name       [n] 匹配数组下标，[*] 匹配任意下标
+#   $..x-*               键名中可以使用 * 和 ? 通配符
+#   examples             不以 $ 开头时只按键名匹配，等同于 $..examples
+_TOKEN = re.compile(r"\.\.|\.|\[(\*|\d+)\]|([^.\[\]]+)")
+
+# 规则中的一个路径段："descend" 匹配任意多层；"any" 匹配任意一层；"index" 匹配指定下标；"key" 按通配符匹配键名
+DESCEND = ("descend",)
+ANY = ("any",)
+
+
+def compile_pattern(pattern):
+    pattern = pattern.strip()
+    if not pattern.startswith("$"):
+        pattern = "$.." + pattern
+    tokens = []
+    pos = 1
+    while pos < len(pattern):
+        match = _TOKEN.match(pattern, pos)
+        if not match:
+            raise ValueError(f"Invalid path rule {pattern!r} at position {pos}")
+        text, index, key = match.group(0), match.group(1), match.group(2)
+        if text == "..":
+            tokens.append(DESCEND)
+        elif text == ".":
+            pass
+        elif index is not None:
+            tokens.append(ANY if index == "*" else ("index", int(index)))
+        else:
+            tokens.append(ANY if key == "*" else ("key", key))
+        pos = match.end()
+    if not tokens or tokens[-1] == DESCEND:
+        raise ValueError(f"Invalid path rule {pattern!r}: must name at least one key and cannot end with '..'")
+    return tuple(tokens)
+
+
+def _token_matches(token, key):
+    if token == ANY:
+        return True
+    if token[0] == "index":
+        return isinstance(key, int) and key == token[1]
+    return isinstance(key, str) and fnmatchcase(key, token[1])
+
+
+# 一组规则编译成的非确定有限自动机：状态是 (规则编号, 已匹配的段数) 的集合
+# 遍历 JSON 时每下降一层调用一次 step；转移结果按 (状态, 键的匹配情况) 缓存，同一任务内重复的键不会重复计算
+class _Automaton:
+    def __init__(self, patterns):
+        self.patterns = [compile_pattern(pattern) for pattern in patterns]
+        self.start = self._closure({(i, 0) for i in range(len(self.patterns))})
+        self._transitions = {}
+        self._tokens = list({token for tokens in self.patterns for token in tokens if token != DESCEND})
+        self._token_ids = {token: i for i, token in enumerate(self._tokens)}
+        self._classify = lru_cache(maxsize=65536)(self._classify_key)
+
+    # 把键归类为它能匹配的规则段的集合，匹配情况相同的键共用一个转移结果
+    def _classify_key(self, key):
+        return frozenset(i for i, token in enumerate(self._tokens) if _token_matches(token, key))
+
+    def _closure(self, positions):
+        result = set(positions)
+        stack = list(positions)
+        while stack:
+            rule, pos = stack.pop()
+            tokens = self.patterns[rule]
+            if pos < len(tokens) and tokens[pos] == DESCEND and (rule, pos + 1) not in result:
+                result.add((rule, pos + 1))
+                stack.append((rule, pos + 1))
+        return frozenset(result)
+
+    def step(self, state, key):
+        matched = self._classify(key)
+        cache_key = (state, matched)
+        if cache_key not in self._transitions:
+            positions = set()
+            for rule, pos in state:
+                tokens = self.patterns[rule]
+                if pos >= len(tokens):
+                    continue
+                token = tokens[pos]
+                if token == DESCEND:
+                    positions.add((rule, pos))
+                elif self._token_ids[token] in matched:
+                    positions.add((rule, pos + 1))
+            self._transitions[cache_key] = self._closure(positions)
+        return self._transitions[cache_key]
+
+    def accepts(self, state):
+        return any(pos == len(self.patterns[rule]) for rule, pos in state)
+
+
+# 包含/排除规则：命中排除规则的节点连同整个子树都不访问；
+# 给出包含规则时只收集命中包含规则的节点及其子树中的文本，不可能再命中任何包含规则的子树也直接跳过
+class PathRules:
+    def __init__(self, include=(), exclude=()):
+        self.patterns = (tuple(include), tuple(exclude))
+        self.include = _Automaton(include) if include else None
+        self.exclude = _Automaton(exclude) if exclude else None
+
+    # 传给 CLI 的工作进程时只传规则文本，在进程内重新编译
+    def __reduce__(self):
+        return PathRules, self.patterns
+
+    @classmethod
+    def from_text(cls, include_text="", exclude_text=""):
+        return cls(_lines(include_text), _lines(exclude_text))
+
+    def __bool__(self):
+        return bool(self.include or self.exclude)
+
+    # 根节点的状态：(包含规则状态, 是否已在包含范围内, 排除规则状态)
+    def start(self):
+        include_state = self.include.start if self.include else frozenset()
+        included = self.include is None or self.include.accepts(include_state)
+        return include_state, included, self.exclude.start if self.exclude else frozenset()
+
+    # 下降到子节点 key，返回子节点的状态；子树应被跳过时返回 None
+    def step(self, state, key):
+        include_state, included, exclude_state = state
+        if exclude_state:
+            exclude_state = self.exclude.step(exclude_state, key)
+            if self.exclude.accepts(exclude_state):
+                return None
+        if not included:
+            include_state = self.include.step(include_state, key)
+            if not include_state:
+                return None
+            included = self.include.accepts(include_state)
+        return include_state, included, exclude_state
+
+    @staticmethod
+    def collects(state):
+        return state[1]
+
+
+def _lines(text):
+    return [line.strip() for line in text.splitlines() if line.strip() and not line.strip().startswith("#")]
@@ -0,0 +1,151 @@
+import json
+import threading
+import time
+from contextlib import contextmanager
+
+# Prometheus 指标名前缀
+METRIC_PREFIX = "json_translator"
+
+# 批次延迟直方图的分桶上界（秒）
+LATENCY_BUCKETS = (0.5, 1, 2, 5, 10, 30, 60)
+
+
+def _percentile(values, q):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+# 一次翻译任务的指标：各阶段耗时，以及每个 LLM 批次的延迟、token 用量、失配和重试情况
+# 批次在工作线程中记录，所有方法都是线程安全的
+class RunMetrics:
+    def __init__(self):
+        self.stages = {}
+        self.batches = []
+        self.mismatched = 0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.latency_total = 0.0
+        self.retries = 0
+        self.failed_items = 0
+        self.memory_hits = 0
+        self.glossary_hits = 0
+        self.errors = 0
+        self.started = time.perf_counter()
+        self._lock = threading.Lock()
+
+    # 记录一个阶段的耗时；同名阶段多次出现时累加（例如流式模式的多个窗口）
+    @contextmanager
+    def stage(self, name):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - started
+            with self._lock:
+                self.stages[name] = self.stages.get(name, 0.0) + elapsed
+
+    # 记录一个 LLM 批次：条目数、延迟、输入/输出 token 数、未能对应上的条目数
+    def record_batch(self, items, latency, prompt_tokens, completion_tokens, missing):
+        with self._lock:
+            self.batches.append({"items": items, "latency": latency, "prompt_tokens": prompt_tokens,
+                                 "completion_tokens": completion_tokens, "missing": missing})
+            self.mismatched += bool(missing)
+            self.prompt_tokens += prompt_tokens
+            self.completion_tokens += completion_tokens
+            self.latency_total += latency
+
+    def record_error(self):
+        with self._lock:
+            self.errors += 1
+
+    def record_retry(self, batches=1):
+        with self._lock:
+            self.retries += batches
+
+    def record_failed(self, items):
+        with self._lock:
+            self.failed_items += items
+
+    def record_memory_hits(self, items):
+        with self._lock:
+            self.memory_hits += items
+
+    def record_glossary_hits(self, items):
+        with self._lock:
+            self.glossary_hits += items
+
+    # 汇总为可序列化的运行报告，per_batch 为每个批次的原始记录
+    def report(self):
+        with self._lock:
+            batches = list(self.batches)
+            latencies = [b["latency"] for b in batches]
+            return {
+                "elapsed": time.perf_counter() - self.started,
+                "stages": dict(self.stages),
+                "batches": {
+                    "count": len(batches),
+                    "items": sum(b["items"] for b in batches),
+                    "mismatched": self.mismatched,
+                    "prompt_tokens": self.prompt_tokens,
+                    "completion_tokens": self.completion_tokens,
+                    "latency": {
+                        "mean": self.latency_total / len(batches) if batches else 0.0,
+                        "p50": _percentile(latencies, 0.5),
+                        "p95": _percentile(latencies, 0.95),
+                        "max": max(latencies, default=0.0),
+                    },
+                },
+                "retries": self.retries,
+                "failed_items": self.failed_items,
+                "memory_hits": self.memory_hits,
+                "glossary_hits": self.glossary_hits,
+                "errors": self.errors,
+                "per_batch": batches,
+            }
+
+    def to_json(self, indent=2):
+        return json.dumps(self.report(), ensure_ascii=False, indent=indent)
+
+    # Prometheus 文本格式（text exposition format），可写入 node_exporter 的 textfile 目录或由服务暴露
+    def to_prometheus(self):
+        report = self.report()
+        batches = report["batches"]
+        p = METRIC_PREFIX
+        lines = [f"# HELP {p}_stage_seconds Wall time spent in each stage of the run.",
+                 f"# TYPE {p}_stage_seconds gauge"]
+        lines += [f'{p}_stage_seconds{{stage="{name}"}} {seconds:.6f}' for name, seconds in report["stages"].items()]
+
+        lines += [f"# HELP {p}_batch_latency_seconds Latency of LLM batch requests.",
+                  f"# TYPE {p}_batch_latency_seconds histogram"]
+        latencies = [b["latency"] for b in report["per_batch"]]
+        for bound in LATENCY_BUCKETS:
+            lines.append(f'{p}_batch_latency_seconds_bucket{{le="{bound}"}} {sum(1 for x in latencies if x <= bound)}')
+        lines += [f'{p}_batch_latency_seconds_bucket{{le="+Inf"}} {len(latencies)}',
+                  f"{p}_batch_latency_seconds_sum {sum(latencies):.6f}",
+                  f"{p}_batch_latency_seconds_count {len(latencies)}"]
+
+        counters = [
+            ("batch_items_total", "Items sent to the LLM, including retries.", batches["items"]),
+            ("mismatched_batches_total", "Batches whose output could not be matched item by item.",
+             batches["mismatched"]),
+            ("prompt_tokens_total", "Input tokens reported by the provider.", batches["prompt_tokens"]),
+            ("completion_tokens_total", "Output tokens reported by the provider.", batches["completion_tokens"]),
+            ("retries_total", "Retry batches scheduled after a mismatch.", report["retries"]),
+            ("failed_items_total", "Items left untranslated.", report["failed_items"]),
+            ("memory_hits_total", "Items served from the translation memory.", report["memory_hits"]),
+            ("glossary_hits_total", "Items resolved locally from the glossary.", report["glossary_hits"]),
+            ("errors_total", "LLM requests that raised an error.", report["errors"]),
+        ]
+        for name, help_text, value in counters:
+            lines += [f"# HELP {p}_{name} {help_text}", f"# TYPE {p}_{name} counter", f"{p}_{name} {value}"]
+        return "\n".join(lines) + "\n"
+
+    # 一行简要汇总，用于 Streamlit 日志区域的实时显示；只读累计值，每完成一个批次调用一次也不会变慢
+    def summary(self):
+        with self._lock:
+            count = len(self.batches)
+            mean = self.latency_total / count if count else 0.0
+            return (f"批次 {count}（失配 {self.mismatched}，重试 {self.retries}），平均延迟 {mean:.2f}s，"
+                    f"token 输入 {self.prompt_tokens} / 输出 {self.completion_tokens}")
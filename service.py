@@ -0,0 +1,222 @@
+import argparse
+import json
+import logging
+import os
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import translator
+from cjk import contains_cjk
+from path_rules import PathRules
+from translator import apply_translations, collect_translations, report_failures
+
+# 配置日志
+logging.basicConfig(format='[%(asctime)s %(filename)s:%(lineno)d] %(levelname)s: %(message)s', level=logging.INFO, force=True)
+
+# 合并窗口（秒）：窗口内到达的文本合并成一次 translate_text 调用；窗口内积累到 SERVICE_MAX_BATCH 条时立即发送
+# SERVICE_FLUSH_WORKERS 为同时进行的合并调用数，SERVICE_REQUEST_TIMEOUT 为单个 HTTP 请求最长等待时间（秒）
+BATCH_WINDOW = float(os.environ.get("SERVICE_BATCH_WINDOW", 0.02))
+MAX_BATCH = int(os.environ.get("SERVICE_MAX_BATCH", 500))
+FLUSH_WORKERS = int(os.environ.get("SERVICE_FLUSH_WORKERS", 4))
+REQUEST_TIMEOUT = float(os.environ.get("SERVICE_REQUEST_TIMEOUT", 300))
+
+
+# 请求合并器：多个调用方并发提交的文本在一个短窗口内合并，经 translator.translate_text 一起查缓存、分批和请求模型
+# 同一语言下已在翻译中的文本不会再次提交，后来的调用方直接等待同一个结果（single-flight）
+# 因此并发负载下模型请求量随不同文本的数量增长，而不是随调用次数增长
+class TranslationCoalescer:
+    def __init__(self, window=BATCH_WINDOW, max_batch=MAX_BATCH, flush_workers=FLUSH_WORKERS, max_workers=None):
+        self.window = window
+        self.max_batch = max_batch
+        self.max_workers = max_workers
+        self.stats = {"requests": 0, "texts": 0, "coalesced": 0, "flushes": 0, "flushed_texts": 0}
+        self._inflight = {}  # (语言, 原文) -> Future
+        self._pending = {}  # 语言 -> 等待发送的原文列表
+        self._pending_count = 0
+        self._cond = threading.Condition()
+        self._closed = False
+        self._executor = ThreadPoolExecutor(max_workers=flush_workers, thread_name_prefix="translate-flush")
+        self._dispatcher = threading.Thread(target=self._dispatch, name="translate-dispatch", daemon=True)
+        self._dispatcher.start()
+
+    # 提交一组文本，返回与之一一对应的 Future，结果为 (译文, 是否失败)；不含中文的文本直接原样返回
+    def submit(self, texts, language="en"):
+        futures = []
+        with self._cond:
+            self.stats["requests"] += 1
+            self.stats["texts"] += len(texts)
+            for text in texts:
+                if not contains_cjk(text):
+                    future = Future()
+                    future.set_result((text, False))
+                elif (language, text) in self._inflight:
+                    future = self._inflight[(language, text)]
+                    self.stats["coalesced"] += 1
+                else:
+                    future = Future()
+                    self._inflight[(language, text)] = future
+                    self._pending.setdefault(language, []).append(text)
+                    self._pending_count += 1
+                futures.append(future)
+            self._cond.notify()
+        return futures
+
+    # 同步翻译，返回 (译文列表, 失败的下标列表)
+    def translate(self, texts, language="en", timeout=REQUEST_TIMEOUT):
+        results = [future.result(timeout) for future in self.submit(texts, language)]
+        return [text for text, _ in results], [i for i, (_, failed) in enumerate(results) if failed]
+
+    # 调度线程：等到第一条文本后再等一个窗口（或积累满 max_batch 条），把这段时间内的文本按语言交给工作线程
+    def _dispatch(self):
+        while True:
+            with self._cond:
+                while not self._pending_count and not self._closed:
+                    self._cond.wait()
+                if self._closed and not self._pending_count:
+                    return
+                deadline = time.monotonic() + self.window
+                while self._pending_count < self.max_batch and not self._closed:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(remaining)
+                pending, self._pending, self._pending_count = self._pending, {}, 0
+            for language, texts in pending.items():
+                self._executor.submit(self._flush, language, texts)
+
+    def _flush(self, language, texts):
+        with self._cond:
+            self.stats["flushes"] += 1
+            self.stats["flushed_texts"] += len(texts)
+        futures = [self._inflight[(language, text)] for text in texts]
+        try:
+            failed = []
+            translated = translator.translate_text(texts, max_workers=self.max_workers, failures=failed,
+                                                   prompt=translator.language_prompt(language),
+                                                   glossary=translator.language_glossary(language))
+            failed = set(failed)
+            for i, future in enumerate(futures):
+                future.set_result((translated[i], i in failed))
+        except Exception as exc:
+            logging.exception(f"Failed to translate {len(texts)} coalesced texts")
+            for future in futures:
+                future.set_exception(exc)
+        finally:
+            # 之后的相同文本重新提交，由翻译记忆直接命中
+            with self._cond:
+                for text in texts:
+                    del self._inflight[(language, text)]
+
+    def snapshot(self):
+        with self._cond:
+            return dict(self.stats)
+
+    # 停止接收新的窗口；已提交的文本仍会发送，等待所有合并调用结束
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        self._dispatcher.join()
+        self._executor.shutdown(wait=True)
+
+
+# HTTP/JSON 接口：
+#   POST /translate  {"texts": [...], "language": "en"}，返回 {"translations": [...], "failed": [下标]}
+#                    或 {"data": 任意 JSON, "language": "en", "include": [...], "exclude": [...]}，
+#                    返回 {"data": 翻译后的 JSON, "failed": [{"path": ..., "source": ...}]}
+#   GET  /health     返回 {"status": "ok"}
+#   GET  /stats      返回请求数、文本数、被合并的文本数和合并调用次数
+class TranslationHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path == "/health":
+            self._send(200, {"status": "ok", "model": translator.provider.model})
+        elif self.path == "/stats":
+            self._send(200, self.server.coalescer.snapshot())
+        else:
+            self._send(404, {"error": f"Unknown path {self.path}"})
+
+    def do_POST(self):
+        if self.path != "/translate":
+            self._send(404, {"error": f"Unknown path {self.path}"})
+            return
+        try:
+            request = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+            if not isinstance(request, dict):
+                raise ValueError("Request body must be a JSON object")
+            language = request.get("language", "en")
+            if language not in translator.TARGET_LANGUAGES:
+                raise ValueError(f"Unsupported language {language!r}")
+            if "texts" in request:
+                texts = request["texts"]
+                if not isinstance(texts, list) or not all(isinstance(text, str) for text in texts):
+                    raise ValueError("'texts' must be a list of strings")
+                response = self._translate_texts(texts, language)
+            elif "data" in request:
+                rules = PathRules(request.get("include", ()), request.get("exclude", ()))
+                response = self._translate_data(request["data"], language, rules)
+            else:
+                raise ValueError("Request must contain 'texts' or 'data'")
+        except ValueError as e:
+            self._send(400, {"error": str(e)})
+            return
+        except Exception as e:
+            self._send(502, {"error": repr(e)})
+            return
+        self._send(200, response)
+
+    def _translate_texts(self, texts, language):
+        translations, failed = self.server.coalescer.translate(texts, language)
+        return {"translations": translations, "failed": failed}
+
+    def _translate_data(self, data, language, rules):
+        root, locations = collect_translations(data, rules)
+        unique_texts = list(dict.fromkeys(parent[key] for parent, key, _ in locations))
+        translations, failed = self.server.coalescer.translate(unique_texts, language)
+        failures = []
+        report_failures(locations, {unique_texts[i] for i in failed}, failures)
+        apply_translations(locations, dict(zip(unique_texts, translations)))
+        return {"data": root[0], "failed": failures}
+
+    def _send(self, status, payload):
+        body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        logging.debug(f"{self.address_string()} {format % args}")
+
+
+# 创建服务（不启动），port 为 0 时由系统分配端口
+def make_server(host="127.0.0.1", port=8765, coalescer=None):
+    server = ThreadingHTTPServer((host, port), TranslationHandler)
+    server.daemon_threads = True
+    server.coalescer = coalescer or TranslationCoalescer()
+    return server
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Local HTTP/JSON translation service.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--concurrency", type=int, default=None, help="concurrent LLM requests per coalesced call")
+    args = parser.parse_args(argv)
+
+    server = make_server(args.host, args.port, TranslationCoalescer(max_workers=args.concurrency))
+    logging.info(f"Serving translations on http://{args.host}:{server.server_address[1]} "
+                 f"(provider {translator.provider.name}, model {translator.provider.model})")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        server.coalescer.close()
+
+
+if __name__ == "__main__":
+    main()
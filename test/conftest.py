@@ -0,0 +1,18 @@
+import pytest
+
+import translator
+from mock_provider import MockProvider
+from translation_memory import TranslationMemory
+
+
+# 把 translator 的服务商换成离线模拟服务商、翻译记忆换成临时目录中的空库，返回服务商
+# 用法：provider = mock_translator("mock-jobs", latency=0.05)；provider_class 可以是 MockProvider 的子类
+@pytest.fixture
+def mock_translator(tmp_path, monkeypatch):
+    def install(model="mock-model", provider_class=MockProvider, **kwargs):
+        provider = provider_class(model=model, **kwargs)
+        monkeypatch.setattr(translator, "provider", provider)
+        monkeypatch.setattr(translator, "translation_memory", TranslationMemory(str(tmp_path / f"{model}.sqlite3")))
+        return provider
+
+    return install
@@ -0,0 +1,22 @@
+import json
+
+from batch_protocol import JsonProtocol, SplitTagProtocol
+
+
+def test_split_tag_mismatch_fails_whole_batch():
+    protocol = SplitTagProtocol()
+    assert protocol.parse("a\n🚀b", ["甲", "乙"]) == ["a", "b"]
+    assert protocol.parse("a\nb", ["甲", "乙"]) == [None, None]
+
+
+def test_json_protocol_matches_by_id_and_salvages_partial_output():
+    protocol = JsonProtocol()
+    batch = ["蓝票", "红票", "开票项"]
+    messages = protocol.build_messages("prompt", batch)
+    assert json.loads(messages[-1]["content"]) == {"1": "蓝票", "2": "红票", "3": "开票项"}
+
+    # 漏掉、打乱顺序的条目按编号对应
+    assert protocol.parse('{"3": "invoicing item", "1": "invoice"}', batch) == ["invoice", None, "invoicing item"]
+    # 被截断的输出仍可取回完整的条目
+    assert protocol.parse('{"1": "invoice", "2": "credit inv', batch) == ["invoice", None, None]
+    assert protocol.parse('```json\n{"result": {"1": "a", "2": "b", "3": "c"}}\n```', batch) == ["a", "b", "c"]
@@ -0,0 +1,24 @@
+from batching import AdaptiveBatcher, estimate_tokens
+
+
+def test_packs_by_token_budget_and_isolates_long_strings():
+    texts = ["蓝票"] * 10 + ["发票" * 500] + ["红票"] * 10
+    batcher = AdaptiveBatcher(max_input_tokens=20, max_output_tokens=20, max_items=30)
+    batches = list(batcher.iter_batches(texts, range(len(texts))))
+
+    assert [10] in batches
+    assert sorted(i for batch in batches for i in batch) == list(range(len(texts)))
+    for batch in batches:
+        if batch != [10]:
+            assert sum(estimate_tokens(texts[i]) for i in batch) <= 20
+
+
+def test_shrinks_after_mismatch_and_recovers():
+    batcher = AdaptiveBatcher(max_input_tokens=10000, max_output_tokens=10000, max_items=32)
+    batcher.record(32, True)
+    batcher.record(16, True)
+    assert batcher.limits()[2] == 8
+
+    for _ in range(30):
+        batcher.record(8, False)
+    assert batcher.scale == 1.0
@@ -0,0 +1,47 @@
+import re
+
+import chunking
+import translator
+from chunking import split_text
+
+PARAGRAPH = "这是一段很长的接口说明，用来描述接口的行为。" * 6
+LONG_TEXT = "  接口说明\n\n" + "\n\n".join([PARAGRAPH] * 3) + "\n   \n  ```\n  code = 1\n  ```\n"
+
+
+def test_split_keeps_whitespace_and_line_structure():
+    pieces = split_text(LONG_TEXT, 60)
+    assert "".join(piece for piece, _ in pieces) == LONG_TEXT
+    sent = [piece for piece, translate in pieces if translate]
+    assert len(sent) == 10
+    assert all(piece.strip() == piece and "\n" not in piece for piece in sent)
+    assert ("```", False) in pieces and ("code = 1", False) in pieces
+
+    # Windows 换行：\r 留在换行片段中，不随文本发送给模型
+    crlf = LONG_TEXT.replace("\n", "\r\n")
+    pieces = split_text(crlf, 60)
+    assert "".join(piece for piece, _ in pieces) == crlf
+    sent = [piece for piece, translate in pieces if translate]
+    assert len(sent) == 10 and not any("\r" in piece for piece in sent)
+
+
+def test_long_texts_are_translated_in_chunks_and_reassembled(monkeypatch, mock_translator):
+    provider = mock_translator("mock-chunking")
+    monkeypatch.setattr(chunking, "CHUNK_TOKENS", 60)
+
+    failures = []
+    translated = translator.translate_text(["备注", LONG_TEXT], max_workers=2, failures=failures)
+    assert failures == []
+    assert translated[0] == "enen"
+    # 换行、空行和缩进原样保留，只有中文被替换；每段的 3 块拼回同一行
+    assert re.sub(r"[^\s`=\d]+", "x", translated[1]) == re.sub(r"[^\s`=\d]+", "x", LONG_TEXT)
+    assert not re.search(r"[一-鿿]", translated[1])
+    assert translated[1].split("\n")[2] == "en" * len(PARAGRAPH)
+    # 三段相同，重复的块只翻译一次
+    assert provider.calls == 1
+
+
+def test_chunks_split_at_chinese_full_stops_are_joined_with_a_space():
+    plan = chunking.ChunkPlan(["第一句很长很长。" * 2 + "第二句很长很长。" * 2], 17)
+    assert plan.units == ["第一句很长很长。第一句很长很长。", "第二句很长很长。第二句很长很长。"]
+    translated, failed = plan.assemble(["First.", "Second."])
+    assert failed == [] and translated == ["First. Second."]
@@ -0,0 +1,19 @@
+from cjk import classify_cjk, contains_cjk
+
+
+def test_contains_cjk_ranges():
+    assert contains_cjk("开票项")
+    assert contains_cjk("㐀")        # 扩展 A
+    assert contains_cjk("\U00020000")    # 扩展 B
+    assert contains_cjk("豈")        # 兼容汉字
+    assert contains_cjk("a，b")          # 全角标点
+    assert not contains_cjk("invoice")
+    assert not contains_cjk("ＡＢＣ１２３")  # 全角字母和数字
+    assert not contains_cjk("　")    # 全角空格
+    assert not contains_cjk("")
+
+
+def test_classify_cjk_matches_contains_cjk():
+    texts = ["", "abc", "蓝票", "id: 1", "（备注）", "\U0002a700"]
+    assert classify_cjk(texts) == [contains_cjk(text) for text in texts]
+    assert classify_cjk([]) == []
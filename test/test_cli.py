@@ -0,0 +1,25 @@
+import json
+
+import cli
+import translator
+
+
+def test_translates_directory_into_output_tree(tmp_path, monkeypatch):
+    source = tmp_path / "in"
+    (source / "sub").mkdir(parents=True)
+    (source / "a.json").write_text(json.dumps({"name": "蓝票", "id": 1}, ensure_ascii=False), encoding="utf-8")
+    (source / "sub" / "b.json").write_text(json.dumps(["蓝票", "红票"], ensure_ascii=False), encoding="utf-8")
+
+    calls = []
+
+    def fake_translate_text(texts, **kwargs):
+        calls.append(list(texts))
+        return [f"EN({text})" for text in texts]
+
+    monkeypatch.setattr(translator, "translate_text", fake_translate_text)
+    assert cli.main([str(source), "-o", str(tmp_path / "out"), "--workers", "2"]) == 0
+
+    # 所有文件的文本合并去重后只请求一次
+    assert calls == [["蓝票", "红票"]]
+    assert json.loads((tmp_path / "out" / "a.json").read_text(encoding="utf-8")) == {"name": "EN(蓝票)", "id": 1}
+    assert json.loads((tmp_path / "out" / "sub" / "b.json").read_text(encoding="utf-8")) == ["EN(蓝票)", "EN(红票)"]
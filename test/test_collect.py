@@ -0,0 +1,29 @@
+import sys
+
+from translator import apply_translations, collect_translations, format_path
+
+
+def test_collects_and_writes_back_documents_deeper_than_the_recursion_limit():
+    depth = sys.getrecursionlimit() + 100
+    node = {"leaf": "备注", "id": 1}
+    for _ in range(depth):
+        node = {"child": [node, "审核状态"]}
+    data = {"title": "接口说明", "body": node, "code": "ok"}
+
+    root, locations = collect_translations(data)
+    assert len(locations) == depth + 2
+    # 按文档顺序：标题、最深处的叶子，再从最深处向上依次是每一层的 "审核状态"
+    assert format_path(locations[0][2]) == "$.title"
+    assert format_path(locations[1][2]) == "$.body" + ".child[0]" * depth + ".leaf"
+    assert format_path(locations[2][2]) == "$.body" + ".child[0]" * (depth - 1) + ".child[1]"
+    assert format_path(locations[-1][2]) == "$.body.child[1]"
+
+    # 重复的原文在每个位置都被替换
+    apply_translations(locations, {"接口说明": "API description", "备注": "Note", "审核状态": "Review status"})
+    translated = root[0]
+    assert translated["title"] == "API description" and translated["code"] == "ok"
+    node = translated["body"]
+    for _ in range(depth):
+        assert node["child"][1] == "Review status"
+        node = node["child"][0]
+    assert node == {"leaf": "Note", "id": 1}
@@ -0,0 +1,30 @@
+import threading
+import time
+
+import translator
+
+
+def test_batches_run_concurrently_and_results_keep_source_order(monkeypatch):
+    texts = [f"文本{i}" for i in range(8)]
+    lock = threading.Lock()
+    active = [0]
+    peak = [0]
+    finished = []
+
+    # 越靠前的批次耗时越长，完成顺序与提交顺序相反
+    def slow_batch(batch, protocol, prompt, metrics=None):
+        with lock:
+            active[0] += 1
+            peak[0] = max(peak[0], active[0])
+        time.sleep(0.01 * (len(texts) - texts.index(batch[0])))
+        with lock:
+            active[0] -= 1
+            finished.append(batch[0])
+        return [f"EN({text})" for text in batch], ""
+
+    monkeypatch.setattr(translator, "translate_batch", slow_batch)
+    result = translator.translate_text(texts, batch_size=1, max_workers=3, use_memory=False,
+                                       glossary=translator.no_glossary)
+    assert result == [f"EN({text})" for text in texts]
+    assert peak[0] == 3
+    assert finished != texts
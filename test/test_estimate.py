@@ -0,0 +1,28 @@
+import io
+import json
+
+import translator
+
+
+def test_dry_run_estimates_without_calling_the_provider(tmp_path, monkeypatch, mock_translator):
+    monkeypatch.chdir(tmp_path)
+    provider = mock_translator("mock-estimate")
+    data = {"status": "审核状态", "type": "蓝票", "items": ["审核状态", "备注", "已驳回"]}
+    source = io.BytesIO(json.dumps(data, ensure_ascii=False).encode("utf-8"))
+
+    estimate = translator.translate_and_save_json(source, None, dry_run=True, max_workers=2)
+    assert provider.calls == 0
+    assert (estimate["strings"], estimate["unique"], estimate["calls"]) == (5, 4, 1)
+    english = estimate["languages"]["en"]
+    assert (english["glossary_hits"], english["cache_hits"], english["pending"]) == (1, 0, 3)
+    assert english["prompt_tokens"] > 0 and english["completion_tokens"] > 0
+    assert english["latency_samples"] == 0
+    assert estimate["eta_seconds"] == translator.default_batch_latency
+
+    # 翻译后同一文件全部命中缓存，耗时按记录下来的批次延迟估算
+    translator.translate_and_save_json(source, None, resume=False)
+    estimate = translator.translate_and_save_json(source, None, dry_run=True, languages=["en", "ja"])
+    english, japanese = estimate["languages"]["en"], estimate["languages"]["ja"]
+    assert (english["hit_ratio"], english["calls"], english["latency_samples"]) == (1.0, 0, 1)
+    assert (japanese["pending"], japanese["calls"]) == (4, 1)
+    assert estimate["calls"] == 1 and provider.calls == 1
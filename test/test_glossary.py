@@ -0,0 +1,28 @@
+import translator
+from glossary import Glossary
+
+
+def test_resolves_only_fully_covered_strings():
+    glossary = Glossary({"红票": "credit invoice", "红字发票": "credit invoice", "发票": "invoice",
+                         "开票项": "invoicing item"})
+    assert glossary.resolve("红字发票") == "credit invoice"
+    assert glossary.resolve("红票，开票项") == "credit invoice, invoicing item"
+    assert glossary.resolve("开票项ID 2") == "invoicing item ID 2"
+    # 重叠的术语按能完整覆盖的切分选择
+    assert glossary.resolve("红字发票发票") == "credit invoice invoice"
+    assert glossary.resolve("发票号码") is None
+    assert glossary.resolve("，") is None
+
+
+def test_glossary_terms_bypass_the_model(monkeypatch):
+    sent = []
+
+    def fake_batch(batch, protocol, prompt, metrics=None):
+        sent.extend(batch)
+        return [f"EN({text})" for text in batch], ""
+
+    monkeypatch.setattr(translator, "translate_batch", fake_batch)
+    glossary = Glossary({"蓝票": "invoice"})
+    result = translator.translate_text(["蓝票", "发票号码", "蓝票"], use_memory=False, glossary=glossary)
+    assert result == ["invoice", "EN(发票号码)", "invoice"]
+    assert sent == ["发票号码"]
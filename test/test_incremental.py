@@ -0,0 +1,22 @@
+import translator
+
+
+def test_only_added_and_changed_strings_are_translated(monkeypatch):
+    calls = []
+
+    def fake_translate_text(texts, **kwargs):
+        calls.append(list(texts))
+        return [f"EN({text})" for text in texts]
+
+    monkeypatch.setattr(translator, "translate_text", fake_translate_text)
+    old_source = {"a": "蓝票", "b": "红票", "c": ["开票项", "专票"], "d": "删除的"}
+    # 上一版译文中 a 经过人工修改，c[1] 上次未翻译成功
+    old_translated = {"a": "Invoice (edited)", "b": "credit invoice", "c": ["invoicing item", "专票"], "d": "removed"}
+    new_source = {"a": "蓝票", "b": "红字发票", "c": ["开票项", "专票"], "e": "红票", "f": "新增"}
+
+    previous = translator.collect_previous(old_source, old_translated)
+    result = translator.translate_data(new_source, previous=previous)
+
+    assert calls == [["红字发票", "专票", "新增"]]
+    assert result == {"a": "Invoice (edited)", "b": "EN(红字发票)", "c": ["invoicing item", "EN(专票)"],
+                      "e": "credit invoice", "f": "EN(新增)"}
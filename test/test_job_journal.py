@@ -0,0 +1,35 @@
+import pytest
+
+import translator
+from job_journal import JobJournal
+
+
+def test_resumes_after_failure_without_repeating_completed_batches(tmp_path, monkeypatch):
+    texts = [f"文本{i}" for i in range(6)]
+    sent = []
+    rate_limited = [True]
+
+    def flaky_batch(batch, protocol, prompt, metrics=None):
+        sent.extend(batch)
+        if "文本3" in batch and rate_limited[0]:
+            raise RuntimeError("rate limited")
+        return [f"EN({text})" for text in batch], ""
+
+    monkeypatch.setattr(translator, "translate_batch", flaky_batch)
+    journal = JobJournal(str(tmp_path / "job.jsonl"))
+    with pytest.raises(RuntimeError):
+        translator.translate_text(texts, batch_size=2, max_workers=1, use_memory=False, journal=journal)
+    journal.close()
+    assert sent == texts[:4]
+
+    # 重新打开同一个日志，只发送尚未完成的批次
+    sent.clear()
+    rate_limited[0] = False
+    with open(journal.path, "a", encoding="utf-8") as f:
+        f.write('{"文本')  # 模拟写入途中退出留下的残行
+    journal = JobJournal(journal.path)
+    assert translator.translate_text(texts, batch_size=2, max_workers=1, use_memory=False,
+                                     journal=journal) == [f"EN({text})" for text in texts]
+    journal.close()
+    assert sent == texts[2:]
+    assert JobJournal(journal.path).completed == {text: f"EN({text})" for text in texts}
@@ -0,0 +1,72 @@
+import json
+import os
+import time
+
+import translator
+from jobs import DONE, JobManager, ResultCache
+
+
+def wait_for(job, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not job.done and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return job
+
+
+def test_identical_uploads_share_one_job_and_hit_the_cache(tmp_path, monkeypatch, mock_translator):
+    monkeypatch.chdir(tmp_path)
+    provider = mock_translator("mock-jobs", latency=0.05)
+    data = json.dumps({"name": "审核状态"}, ensure_ascii=False).encode("utf-8")
+    cache = ResultCache(str(tmp_path / "results"))
+
+    manager = JobManager(workers=2, cache=cache)
+    job = manager.submit(data, "a.json")
+    assert manager.submit(data, "a.json") is job
+    wait_for(job)
+    assert job.status == DONE and not job.cached
+    with open(job.result_path, encoding="utf-8") as f:
+        assert json.load(f) == {"name": "enenenen"}
+
+    # 新的进程（管理器）中相同的输入直接命中结果缓存
+    cached = JobManager(workers=1, cache=cache).submit(data, "b.json")
+    assert cached.status == DONE and cached.cached
+    assert cached.result_path == job.result_path
+    assert provider.calls == 1
+
+
+def test_streaming_results_with_untranslated_items_are_not_cached(tmp_path, monkeypatch, mock_translator):
+    monkeypatch.chdir(tmp_path)
+    mock_translator("mock-jobs-stream", corruption_rate=1.0)
+    monkeypatch.setattr(translator, "default_retry_budget", 0)
+    data = json.dumps({"name": "审核状态", "note": "备注"}, ensure_ascii=False).encode("utf-8")
+    cache = ResultCache(str(tmp_path / "results"))
+
+    manager = JobManager(workers=1, cache=cache)
+    job = wait_for(manager.submit(data, "a.json", streaming=True))
+    assert job.status == DONE
+    assert job.failures == [{"path": None, "source": "审核状态"}, {"path": None, "source": "备注"}]
+    with open(job.result_path, encoding="utf-8") as f:
+        assert json.load(f) == {"name": "审核状态", "note": "备注"}
+    assert cache.get(job.key) is None
+    # 同一管理器中重新提交返回原任务，retry 时重新翻译
+    assert manager.submit(data, "a.json", streaming=True) is job
+    retried = wait_for(manager.submit(data, "a.json", streaming=True, retry=True))
+    assert retried is not job and not retried.cached and len(retried.failures) == 2
+
+
+def test_eviction_skips_job_files_and_evicted_results_are_retranslated(tmp_path, monkeypatch, mock_translator):
+    monkeypatch.chdir(tmp_path)
+    mock_translator("mock-jobs-evict")
+    cache = ResultCache(str(tmp_path / "results"), max_files=1)
+    (tmp_path / "results").mkdir()
+    (tmp_path / "results" / "job-running.tmp.json").write_text("{}")
+
+    manager = JobManager(workers=1, cache=cache)
+    first = wait_for(manager.submit(json.dumps({"a": "备注"}, ensure_ascii=False).encode("utf-8"), "a.json"))
+    second = wait_for(manager.submit(json.dumps({"b": "备注"}, ensure_ascii=False).encode("utf-8"), "b.json"))
+    # 只淘汰缓存的结果文件，任务的临时文件保留
+    assert sorted(os.listdir(cache.directory)) == sorted([os.path.basename(second.result_path), "job-running.tmp.json"])
+
+    # 结果已被淘汰的任务不再返回，重新翻译
+    again = wait_for(manager.submit(json.dumps({"a": "备注"}, ensure_ascii=False).encode("utf-8"), "a.json"))
+    assert again is not first and again.status == DONE and os.path.exists(again.result_path)
@@ -0,0 +1,40 @@
+import io
+import json
+
+from json_stream import stream_translate
+
+
+def fake_translate(texts):
+    return [f"EN({text})" for text in texts]
+
+
+def run(source, **kwargs):
+    writer = io.StringIO()
+    count = stream_translate(io.StringIO(source), writer, fake_translate, **kwargs)
+    return writer.getvalue(), count
+
+
+def test_translates_values_but_not_keys():
+    source = json.dumps({"名称": "蓝票", "id": "abc", "items": ["红票", 1, None, {"k": "开票项"}]},
+                        ensure_ascii=False, indent=2)
+    output, count = run(source)
+
+    assert count == 3
+    assert json.loads(output) == {"名称": "EN(蓝票)", "id": "abc", "items": ["EN(红票)", 1, None, {"k": "EN(开票项)"}]}
+    # 原样保留缩进和换行
+    assert output == source.replace('"蓝票"', '"EN(蓝票)"').replace('"红票"', '"EN(红票)"') \
+        .replace('"开票项"', '"EN(开票项)"')
+
+
+def test_tokens_split_across_tiny_chunks():
+    data = {"a": "含有\"引号\"和\\n转义", "b": ["x,:{}[]", "中,文"], "c": "蓝票"}
+    source = json.dumps(data)  # ensure_ascii 输出 \uXXXX 转义
+    output, count = run(source, chunk_size=1, window_size=2)
+
+    assert count == 3
+    assert json.loads(output) == {"a": "EN(含有\"引号\"和\\n转义)", "b": ["x,:{}[]", "EN(中,文)"], "c": "EN(蓝票)"}
+
+
+def test_top_level_string():
+    output, count = run('"数电票"')
+    assert (json.loads(output), count) == ("EN(数电票)", 1)
@@ -0,0 +1,43 @@
+import io
+import json
+import zipfile
+
+import translator
+from mock_provider import MockProvider
+
+
+class RecordingProvider(MockProvider):
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.prompts = []
+
+    def complete(self, messages, **kwargs):
+        self.prompts.append(messages[0]["content"])
+        return super().complete(messages, **kwargs)
+
+
+def test_one_pass_writes_one_output_per_language(tmp_path, mock_translator):
+    provider = mock_translator("mock-languages", RecordingProvider)
+    data = {"status": "审核状态", "type": "蓝票", "items": ["审核状态", "备注"]}
+    source = io.BytesIO(json.dumps(data, ensure_ascii=False).encode("utf-8"))
+    failures = []
+
+    output = translator.translate_and_save_json(source, None, failures=failures, languages=["en", "ja", "en"],
+                                                output_path=str(tmp_path / "out.zip"), resume=False)
+    with zipfile.ZipFile(output) as archive:
+        assert sorted(archive.namelist()) == ["en.json", "ja.json"]
+        english = json.loads(archive.read("en.json"))
+        japanese = json.loads(archive.read("ja.json"))
+
+    # 术语表只用于英文；其余文本每种语言各请求一次，使用各自的提示词
+    assert english == {"status": "enenenen", "type": "invoice", "items": ["enenenen", "enen"]}
+    assert japanese == {"status": "enenenen", "type": "enen", "items": ["enenenen", "enen"]}
+    assert provider.calls == 2
+    assert any(prompt.startswith(translator.sys_prompt) for prompt in provider.prompts)
+    assert any("日文" in prompt for prompt in provider.prompts)
+    assert failures == []
+
+    # 不给 output_path 时返回每种语言的字节；各语言的译文已在翻译记忆中，不再请求模型
+    results = translator.translate_and_save_json(source, None, languages=["en", "ja"], resume=False, indent=None)
+    assert json.loads(results["ja"]) == japanese
+    assert provider.calls == 2
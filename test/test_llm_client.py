@@ -0,0 +1,101 @@
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+
+import llm_client
+from llm_client import OpenAICompatibleProvider, ProviderDispatcher
+from mock_provider import MockProvider
+
+MESSAGES = [{"role": "system", "content": "prompt"}, {"role": "user", "content": "蓝票"}]
+
+
+def test_fails_over_and_skips_unhealthy_provider():
+    primary = MockProvider(error_rate=1.0)
+    secondary = MockProvider()
+    dispatcher = ProviderDispatcher([primary, secondary], hedge_percentile=0)
+
+    for _ in range(5):
+        assert dispatcher.complete(MESSAGES).content == "enen"
+    # 连续失败后主服务商暂停使用
+    assert primary.calls == 3
+    assert secondary.calls == 5
+    dispatcher.close()
+
+
+def test_hedges_slow_request_to_second_provider():
+    primary = MockProvider(latency=1.0)
+    secondary = MockProvider()
+    dispatcher = ProviderDispatcher([primary, secondary], hedge_percentile=0.95, hedge_budget=1.0)
+    for _ in range(20):
+        dispatcher.health[primary].record_success(0.01)
+
+    started = time.perf_counter()
+    assert dispatcher.complete(MESSAGES).content == "enen"
+    assert time.perf_counter() - started < 0.5
+    assert dispatcher.hedges == 1
+
+    started = time.perf_counter()
+    assert asyncio.run(dispatcher.acomplete(MESSAGES)).content == "enen"
+    assert time.perf_counter() - started < 0.5
+    assert dispatcher.hedges == 2
+    dispatcher.close()
+
+
+# 代替 openai/groq SDK 的假模块，记录创建的连接池和客户端
+class FakeSDK:
+    DEFAULT_CONNECTION_LIMITS = SimpleNamespace()
+
+    def __init__(self):
+        self.http_clients = []
+        self.clients = []
+
+    def DefaultHttpxClient(self, limits):
+        http_client = SimpleNamespace(limits=limits)
+        self.http_clients.append(http_client)
+        return http_client
+
+    def Client(self, http_client, **kwargs):
+        def create(model, messages, **options):
+            usage = SimpleNamespace(prompt_tokens=3, completion_tokens=2)
+            return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=f"{model}:ok"))],
+                                   usage=usage)
+
+        client = SimpleNamespace(http_client=http_client, kwargs=kwargs,
+                                 chat=SimpleNamespace(completions=SimpleNamespace(create=create)))
+        self.clients.append(client)
+        return client
+
+
+def test_provider_is_shared_and_creates_its_pooled_client_lazily(monkeypatch):
+    sdk = FakeSDK()
+    imported = []
+
+    def import_module(name):
+        imported.append(name)
+        return sdk
+
+    created = []
+
+    def fake_provider():
+        created.append(1)
+        return OpenAICompatibleProvider("fake", "fake-model", "fake_sdk", "Client", "AsyncClient", api_key="key")
+
+    monkeypatch.setattr(llm_client, "importlib", SimpleNamespace(import_module=import_module))
+    monkeypatch.setitem(llm_client.PROVIDER_FACTORIES, "fake", fake_provider)
+    monkeypatch.setattr(llm_client, "_providers", {})
+
+    # 获取服务商不导入 SDK、不创建客户端，重复获取返回同一个实例
+    provider = llm_client.get_provider("fake")
+    assert llm_client.get_provider("fake") is provider
+    assert created == [1] and imported == [] and sdk.clients == []
+
+    # 第一次请求时才创建客户端，之后所有线程共用同一个客户端和连接池
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        completions = list(pool.map(lambda _: provider.complete(MESSAGES), range(32)))
+    assert all(completion == ("fake-model:ok", 3, 2) for completion in completions)
+    assert imported == ["fake_sdk"]
+    assert len(sdk.clients) == 1 and len(sdk.http_clients) == 1
+    assert provider.client is sdk.clients[0] and provider.client.http_client is sdk.http_clients[0]
+    assert sdk.clients[0].kwargs == {"api_key": "key"}
+    assert sdk.http_clients[0].limits.max_connections == llm_client.HTTP_MAX_CONNECTIONS
@@ -0,0 +1,57 @@
+import translator
+from masking import MaskPlan, mask, unmask
+from mock_provider import MockProvider
+
+
+def test_masks_non_translatable_spans_and_restores_them():
+    text = "<b>注意</b>：字段 user_id 见 https://example.com/a?b=1。取值 %s 或 {name}，金额 12345.67 元，第 3 页"
+    masked, spans = mask(text)
+    assert masked == "{0}注意{1}：字段 {2} 见 {3}。取值 {4} 或 {5}，金额 {6} 元，第 3 页"
+    assert spans == ["<b>", "</b>", "user_id", "https://example.com/a?b=1", "%s", "{name}", "12345.67"]
+    assert unmask(masked.replace("注意", "Note"), spans) == text.replace("注意", "Note")
+
+    # 只有数字不同的文本替换后相同，只翻译一次
+    plan = MaskPlan(["第 123 页", "第 456 页", "原有{0}占位"])
+    assert plan.units == ["第 {0} 页", "原有{0}占位"]
+    assert plan.restore(["Page {0}", "keep {0}"], [1]) == (["Page 123", "Page 456", "原有{0}占位"], [2])
+
+
+class PlaceholderDroppingProvider(MockProvider):
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.dropped = set()
+
+    # 每个含 {1} 的文本第一次翻译时丢掉 {1}
+    def translate(self, text):
+        translated = super().translate(text)
+        if "{1}" in text and text not in self.dropped:
+            self.dropped.add(text)
+            return translated.replace("{1}", "")
+        return translated
+
+
+def test_items_that_lose_a_placeholder_are_retried(mock_translator):
+    provider = mock_translator("mock-masking", PlaceholderDroppingProvider)
+    texts = ["备注", "详见 https://example.com/docs 和 orderNo", "订单 100001", "订单 100002"]
+
+    failures = []
+    translated = translator.translate_text(texts, failures=failures)
+    assert failures == []
+    assert translated == ["enen", "enen https://example.com/docs en orderNo", "enen 100001", "enen 100002"]
+    # 第一批中丢失占位符的条目单独重试一次；两个订单号替换后是同一条文本
+    assert provider.calls == 2
+
+
+def test_chinese_next_to_urls_code_and_tags_is_still_translated(mock_translator):
+    # 中文紧跟在 URL 后面时不属于 URL；含中文的行内代码和标签属性不替换
+    assert mask("访问https://example.com查看详细说明") == ("访问{0}查看详细说明", ["https://example.com"])
+    assert mask("运行 `打印 说明` 命令") == ("运行 `打印 说明` 命令", [])
+    assert mask('<a title="说明">链接</a>') == ('<a title="说明">链接{0}', ["</a>"])
+
+    mock_translator("mock-masking-cjk")
+    failures = []
+    translated = translator.translate_text(["访问https://example.com查看详细说明", "运行 `打印 说明` 命令",
+                                            '<a title="说明">链接</a>'], failures=failures)
+    assert failures == []
+    assert translated == ["enenhttps://example.comenenenenenen", "enen `enen enen` enen",
+                          '<a title="enen">enen</a>']
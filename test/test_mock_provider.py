@@ -0,0 +1,18 @@
+import translator
+from batch_protocol import JsonProtocol, SplitTagProtocol
+from mock_provider import MockProvider
+
+
+def test_round_trips_both_protocols(mock_translator):
+    mock_translator()
+    for protocol in (SplitTagProtocol(), JsonProtocol()):
+        translated, _ = translator.translate_batch(["蓝票", "a 红票"], protocol, translator.sys_prompt)
+        assert translated == ["enen", "a enen"]
+
+
+def test_corruption_causes_mismatch():
+    provider = MockProvider(corruption_rate=1.0)
+    protocol = SplitTagProtocol()
+    completion = provider.complete(protocol.build_messages("prompt", ["蓝票", "红票"]))
+    assert protocol.parse(completion.content, ["蓝票", "红票"]) == [None, None]
+    assert provider.calls == 1
@@ -0,0 +1,42 @@
+import pickle
+
+import pytest
+
+from path_rules import PathRules
+from translator import collect_translations, format_path
+
+DOC = {
+    "info": {"title": "发票接口", "x-internal-id": "内部编号"},
+    "paths": {
+        "/invoice": {"post": {"summary": "开具发票", "pattern": "^[发票]+$",
+                              "examples": [{"name": "示例发票"}]}},
+    },
+    "tags": [{"name": "发票"}, {"name": "红票"}],
+}
+
+
+def collected(rules):
+    _, locations = collect_translations(DOC, rules)
+    return sorted(format_path(path) for _, _, path in locations)
+
+
+def test_exclude_prunes_matching_subtrees():
+    rules = PathRules(exclude=["$..examples", "pattern", "x-*", "$.tags[1]"])
+    assert collected(rules) == ["$.info.title", "$.paths./invoice.post.summary", "$.tags[0].name"]
+
+
+def test_include_limits_collection_and_prunes_unrelated_branches():
+    rules = PathRules(include=["$.paths.*.*.summary", "$.tags[*]"])
+    assert collected(rules) == ["$.paths./invoice.post.summary", "$.tags[0].name", "$.tags[1].name"]
+    # info 下不可能再命中包含规则，整棵子树不访问
+    assert rules.step(rules.start(), "info") is None
+
+    rules = pickle.loads(pickle.dumps(PathRules(include=["title"], exclude=["$.info"])))
+    assert collected(rules) == []
+
+
+def test_rejects_invalid_patterns():
+    with pytest.raises(ValueError):
+        PathRules(exclude=["$"])
+    with pytest.raises(ValueError):
+        PathRules(include=["$.a.."])
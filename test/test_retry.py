@@ -0,0 +1,46 @@
+import translator
+from run_metrics import RunMetrics
+
+TEXTS = ["好0", "坏1", "好2", "好3", "好4", "好5", "坏6", "好7"]
+
+
+def run(monkeypatch, mock_translator, retry_budget):
+    sent = []
+
+    # 含 "坏" 的文本使整个批次失配，所有条目都解析失败
+    def fake_batch(batch, protocol, prompt, metrics=None):
+        sent.append(batch)
+        if any("坏" in text for text in batch):
+            return [None] * len(batch), "<mismatch>"
+        return [f"EN({text})" for text in batch], ""
+
+    mock_translator(f"mock-retry-{retry_budget}")
+    monkeypatch.setattr(translator, "translate_batch", fake_batch)
+    monkeypatch.setattr(translator, "default_retry_budget", retry_budget)
+    metrics = RunMetrics()
+    failures = []
+    data = {"items": list(TEXTS), "note": "坏1"}
+    translated = translator.translate_data(data, max_workers=1, failures=failures, metrics=metrics,
+                                           glossary=translator.no_glossary)
+    return translated, sent, metrics, failures
+
+
+def test_mismatched_batches_are_bisected_until_only_bad_items_fail(monkeypatch, mock_translator):
+    translated, sent, metrics, failures = run(monkeypatch, mock_translator, 10)
+    assert sent == [TEXTS, TEXTS[:4], TEXTS[4:], TEXTS[:2], TEXTS[2:4], TEXTS[4:6], TEXTS[6:],
+                    ["好0"], ["坏1"], ["坏6"], ["好7"]]
+    # 5 次拆分各用掉 2 次预算，预算正好用完；单条失败不再重试
+    assert metrics.retries == 10
+    assert translated["items"] == ["EN(好0)", "坏1", "EN(好2)", "EN(好3)", "EN(好4)", "EN(好5)", "坏6", "EN(好7)"]
+    assert failures == [{"path": "$.items[1]", "source": "坏1"}, {"path": "$.items[6]", "source": "坏6"},
+                        {"path": "$.note", "source": "坏1"}]
+
+
+def test_exhausted_retry_budget_keeps_remaining_items_untranslated(monkeypatch, mock_translator):
+    translated, sent, metrics, failures = run(monkeypatch, mock_translator, 4)
+    # 拆分两次后预算用完，之后失配的批次整体保留原文
+    assert sent == [TEXTS, TEXTS[:4], TEXTS[4:], TEXTS[:2], TEXTS[2:4]]
+    assert metrics.retries == 4
+    assert translated["items"] == ["好0", "坏1", "EN(好2)", "EN(好3)", "好4", "好5", "坏6", "好7"]
+    assert [failure["path"] for failure in failures] == ["$.items[0]", "$.items[1]", "$.items[4]", "$.items[5]",
+                                                         "$.items[6]", "$.items[7]", "$.note"]
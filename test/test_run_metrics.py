@@ -0,0 +1,28 @@
+import io
+import json
+
+import translator
+from batch_protocol import SplitTagProtocol
+from run_metrics import RunMetrics
+
+
+def test_records_stages_batches_and_exports(tmp_path, monkeypatch, mock_translator):
+    monkeypatch.chdir(tmp_path)
+    mock_translator("mock-metrics")
+    document = {"items": ["审核状态", "备注", "审核状态"], "id": 1}
+
+    metrics = RunMetrics()
+    translator.translate_and_save_json(io.BytesIO(json.dumps(document).encode("utf-8")), None,
+                                       protocol=SplitTagProtocol(), metrics=metrics)
+    report = metrics.report()
+
+    assert {"load", "collect", "translate", "replace", "serialize"} <= set(report["stages"])
+    assert report["batches"]["count"] == 1
+    assert report["batches"]["items"] == 2
+    assert report["batches"]["prompt_tokens"] > 0
+    assert report["failed_items"] == 0
+
+    text = metrics.to_prometheus()
+    assert 'json_translator_stage_seconds{stage="translate"}' in text
+    assert "json_translator_batch_latency_seconds_count 1" in text
+    assert json.loads(metrics.to_json())["batches"]["count"] == 1
@@ -0,0 +1,19 @@
+import json
+
+import pytest
+
+import translator
+
+DATA = {"name": "蓝票", "items": [1, 2.5, None, True], "big": 2 ** 70}
+
+
+@pytest.mark.parametrize("indent", [None, 2, 4])
+def test_serializes_once_with_or_without_orjson(indent, tmp_path, monkeypatch):
+    expected = json.dumps(DATA, ensure_ascii=False, indent=indent,
+                          separators=(",", ":") if indent is None else None).encode("utf-8")
+    assert translator.serialize_json(DATA, indent) == expected
+
+    monkeypatch.setattr(translator, "orjson", None)
+    assert translator.serialize_json(DATA, indent) == expected
+    translator.write_json(DATA, tmp_path / "out.json", indent)
+    assert (tmp_path / "out.json").read_bytes() == expected
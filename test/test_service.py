@@ -0,0 +1,60 @@
+import json
+import threading
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from service import TranslationCoalescer, make_server
+
+
+@pytest.fixture
+def server():
+    server = make_server(port=0, coalescer=TranslationCoalescer(window=0.05))
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+    server.coalescer.close()
+
+
+def post(server, payload):
+    request = urllib.request.Request(f"http://127.0.0.1:{server.server_address[1]}/translate",
+                                     data=json.dumps(payload, ensure_ascii=False).encode("utf-8"),
+                                     headers={"Content-Type": "application/json"})
+    with urllib.request.urlopen(request, timeout=10) as response:
+        return json.loads(response.read())
+
+
+def test_concurrent_requests_share_provider_calls(server, mock_translator):
+    provider = mock_translator("mock-service", latency=0.1)
+    shared = ["审核状态", "备注", "接口说明"]
+
+    def client(i):
+        return post(server, {"texts": shared + [f"请求{i}", "id"]})
+
+    with ThreadPoolExecutor(max_workers=20) as pool:
+        responses = list(pool.map(client, range(20)))
+
+    for i, response in enumerate(responses):
+        assert response["translations"] == ["enenenen", "enen", "enenenen", f"enen{i}", "id"]
+        assert response["failed"] == []
+    # 20 个请求、100 条文本：相同的文本在途时共用一个结果，窗口内的文本合并发送，模型请求次数远少于调用方的请求数
+    stats = server.coalescer.snapshot()
+    assert stats["requests"] == 20 and stats["texts"] == 100
+    assert stats["coalesced"] > 0 and stats["flushes"] < 20
+    assert provider.calls <= 3
+
+    # 翻译整个 JSON 文档，结果与翻译记忆中的一致，不再请求模型
+    response = post(server, {"data": {"status": "审核状态", "internal": {"note": "备注"}}, "exclude": ["internal"]})
+    assert response == {"data": {"status": "enenenen", "internal": {"note": "备注"}}, "failed": []}
+    assert provider.calls <= 3
+
+
+def test_rejects_malformed_requests(server, mock_translator):
+    mock_translator("mock-service")
+    with pytest.raises(urllib.error.HTTPError) as error:
+        post(server, {"texts": "审核状态"})
+    assert error.value.code == 400
@@ -0,0 +1,31 @@
+from translation_memory import TranslationMemory
+
+
+def test_hits_are_keyed_by_prompt_and_model(tmp_path):
+    memory = TranslationMemory(str(tmp_path / "tm.sqlite3"))
+    memory.put_many("prompt", "model-a", {"蓝票": "invoice", "红票": "credit invoice"})
+
+    assert memory.get_many("prompt", "model-a", ["蓝票", "开票项"]) == {"蓝票": "invoice"}
+    assert memory.get_many("prompt", "model-b", ["蓝票"]) == {}
+    assert memory.get_many("other prompt", "model-a", ["蓝票"]) == {}
+
+
+def test_evicts_least_recently_used(tmp_path):
+    memory = TranslationMemory(str(tmp_path / "tm.sqlite3"), max_entries=2)
+    memory.put_many("p", "m", {"一": "one"})
+    memory.put_many("p", "m", {"二": "two"})
+    memory.get_many("p", "m", ["一"])
+    memory.put_many("p", "m", {"三": "three"})
+
+    assert len(memory) == 2
+    assert memory.get_many("p", "m", ["一", "二", "三"]) == {"一": "one", "三": "three"}
+
+
+def test_invalidate_by_prompt(tmp_path):
+    memory = TranslationMemory(str(tmp_path / "tm.sqlite3"))
+    memory.put_many("old", "m", {"票": "invoice"})
+    memory.put_many("new", "m", {"票": "invoice"})
+
+    assert memory.invalidate("old") == 1
+    assert memory.get_many("old", "m", ["票"]) == {}
+    assert memory.get_many("new", "m", ["票"]) == {"票": "invoice"}
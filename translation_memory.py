@@ -0,0 +1,111 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+
+# 默认缓存位置和容量，可通过环境变量调整
+DEFAULT_PATH = os.environ.get("TRANSLATION_MEMORY_PATH", os.path.join(".cache", "translation_memory.sqlite3"))
+DEFAULT_MAX_ENTRIES = int(os.environ.get("TRANSLATION_MEMORY_MAX_ENTRIES", 200000))
+
+# SQLite 单条语句的参数个数有上限，批量查询时按此大小分块
+_CHUNK = 500
+
+
+def prompt_hash(sys_prompt):
+    return hashlib.sha256(sys_prompt.encode("utf-8")).hexdigest()
+
+
+def entry_key(p_hash, model, text):
+    return hashlib.sha256(f"{p_hash}\0{model}\0{text}".encode("utf-8")).hexdigest()
+
+
+# 持久化翻译记忆：按 (提示词, 模型, 原文) 的哈希缓存译文，超出容量时淘汰最久未使用的条目
+class TranslationMemory:
+    def __init__(self, path=DEFAULT_PATH, max_entries=DEFAULT_MAX_ENTRIES):
+        self.path = path
+        self.max_entries = max_entries
+        self._conn = None
+        self._lock = threading.Lock()
+
+    # 首次使用时才打开数据库，Streamlit 每次重跑脚本都会重新创建本对象
+    def _connect(self):
+        if self._conn is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._conn = sqlite3.connect(self.path, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS entries ("
+                "key TEXT PRIMARY KEY, prompt_hash TEXT NOT NULL, model TEXT NOT NULL, "
+                "source TEXT NOT NULL, target TEXT NOT NULL, last_used REAL NOT NULL)")
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_entries_last_used ON entries (last_used)")
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_entries_prompt ON entries (prompt_hash)")
+            self._conn.commit()
+        return self._conn
+
+    # 批量查询，返回 {原文: 译文}；touch 为 True 时命中的条目会刷新最近使用时间，只做预估时传 False
+    def get_many(self, sys_prompt, model, texts, touch=True):
+        p_hash = prompt_hash(sys_prompt)
+        keys = {entry_key(p_hash, model, text): text for text in texts}
+        hits = {}
+        with self._lock:
+            conn = self._connect()
+            key_list = list(keys)
+            for i in range(0, len(key_list), _CHUNK):
+                chunk = key_list[i:i + _CHUNK]
+                placeholders = ",".join("?" * len(chunk))
+                rows = conn.execute(f"SELECT key, target FROM entries WHERE key IN ({placeholders})", chunk)
+                hit_keys = []
+                for key, target in rows:
+                    hits[keys[key]] = target
+                    hit_keys.append(key)
+                if hit_keys and touch:
+                    conn.execute(f"UPDATE entries SET last_used = ? WHERE key IN ({','.join('?' * len(hit_keys))})",
+                                 [time.time(), *hit_keys])
+            conn.commit()
+        return hits
+
+    # 批量写入 {原文: 译文}
+    def put_many(self, sys_prompt, model, pairs):
+        if not pairs:
+            return
+        p_hash = prompt_hash(sys_prompt)
+        now = time.time()
+        rows = [(entry_key(p_hash, model, source), p_hash, model, source, target, now)
+                for source, target in pairs.items()]
+        with self._lock:
+            conn = self._connect()
+            conn.executemany("INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?, ?)", rows)
+            self._evict(conn)
+            conn.commit()
+
+    # 淘汰最久未使用的条目，使总数不超过 max_entries
+    def _evict(self, conn):
+        (count,) = conn.execute("SELECT COUNT(*) FROM entries").fetchone()
+        overflow = count - self.max_entries
+        if overflow > 0:
+            conn.execute("DELETE FROM entries WHERE key IN "
+                         "(SELECT key FROM entries ORDER BY last_used LIMIT ?)", (overflow,))
+
+    # 使缓存失效：指定提示词时只删除该提示词下的条目，否则清空全部
+    def invalidate(self, sys_prompt=None):
+        with self._lock:
+            conn = self._connect()
+            if sys_prompt is None:
+                cursor = conn.execute("DELETE FROM entries")
+            else:
+                cursor = conn.execute("DELETE FROM entries WHERE prompt_hash = ?", (prompt_hash(sys_prompt),))
+            conn.commit()
+            return cursor.rowcount
+
+    def __len__(self):
+        with self._lock:
+            return self._connect().execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
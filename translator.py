@@ -0,0 +1,799 @@
+import io
+import json
+import logging
+import math
+import os
+import statistics
+import threading
+import time
+import zipfile
+from collections import deque
+from dotenv import load_dotenv
+from io import StringIO
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from batch_protocol import get_protocol
+from batching import estimate_tokens, get_batcher, recent_latencies, record_latency
+from chunking import ChunkPlan
+from cjk import contains_cjk
+from glossary import Glossary, load_default_glossary
+from job_journal import JobJournal, file_digest, job_id
+from masking import MaskPlan, placeholders_intact
+from json_stream import stream_translate
+from llm_client import get_provider
+from run_metrics import RunMetrics
+from translation_memory import TranslationMemory
+
+try:
+    import orjson  # 可选依赖，安装后用于更快的序列化
+except ImportError:
+    orjson = None
+
+load_dotenv(override=True)
+
+# 当前服务商；客户端和连接池在第一次请求时才创建，导入本模块（例如 CLI 的工作进程）不需要任何密钥
+provider = get_provider()
+
+
+sys_prompt = """将所给的文本中的中文，翻译成英文。
+    注意：1）文本中的‘票’，默认是指‘发票’ 
+    2）红票或红字发票: credit invoice 
+    3）蓝票或蓝字发票: invoice 
+    4）开票项: invoicing item
+    5）数电票: fully digitized e-invoice
+    6）专票或增值税专用发票: Special VAT Invoice
+    7）普票或增值税普通发票: Normal VAT Invoice
+    输出要求：1）不要改动输入文本的任何格式和符号 2）只返回翻译结果，不要包含其他内容 3)请保留原始文本中的段落结构"""
+
+# 可选的目标语言：代码 -> 提示词中的语言名称
+TARGET_LANGUAGES = {"en": "英文", "ja": "日文", "ko": "韩文", "zh-Hant": "繁体中文"}
+
+# 英文以外的目标语言使用的提示词；sys_prompt 中的术语说明只适用于英文
+language_prompt_template = """将所给的文本中的中文，翻译成{language}。
+    输出要求：1）不要改动输入文本的任何格式和符号 2）只返回翻译结果，不要包含其他内容 3)请保留原始文本中的段落结构"""
+
+
+# 并发请求数上限，可通过环境变量调整
+max_concurrency = int(os.environ.get("TRANSLATE_CONCURRENCY", 4))
+
+# 每次翻译任务因批次失配而额外发起的请求次数上限
+default_retry_budget = int(os.environ.get("TRANSLATE_RETRY_BUDGET", 100))
+
+# 预估耗时时，当前模型还没有延迟记录时假定的单个批次延迟（秒）
+default_batch_latency = float(os.environ.get("TRANSLATE_DEFAULT_BATCH_LATENCY", 5))
+
+# 持久化翻译记忆，重复运行时跳过已翻译过的文本
+translation_memory = TranslationMemory()
+
+# 术语表，完全由术语组成的文本直接在本地翻译
+default_glossary = load_default_glossary()
+
+# 空术语表：术语表只有英文译名，其他目标语言不使用
+no_glossary = Glossary({})
+
+
+# 目标语言的提示词：prompts 中给出的优先；英文默认使用 prompt（即 sys_prompt 或界面上编辑后的版本），其他语言使用通用模板
+def language_prompt(language, prompt=None, prompts=None):
+    if prompts and prompts.get(language):
+        return prompts[language]
+    if language == "en":
+        return prompt or sys_prompt
+    return language_prompt_template.format(language=TARGET_LANGUAGES.get(language, language))
+
+
+# 目标语言使用的术语表：英文使用 glossary（None 表示 default_glossary），其他语言不使用术语表
+def language_glossary(language, glossary=None):
+    return glossary if language == "en" else no_glossary
+
+
+# 翻译单个批次，返回 (与 batch 等长的翻译结果, 模型原始输出)；失败的条目为 None
+# 丢失或多出占位符的条目也视为失败，由调用方单独重试；批次延迟记在进程内，供 estimate_text 预估耗时
+# 传入 metrics 时记录该批次的延迟、token 用量和失配条目数
+def translate_batch(batch, protocol, prompt, metrics=None):
+    started = time.perf_counter()
+    try:
+        completion = provider.complete(protocol.build_messages(prompt, batch), temperature=0,
+                                       **protocol.request_options())
+    except Exception:
+        if metrics:
+            metrics.record_error()
+        raise
+    latency = time.perf_counter() - started
+    record_latency(provider.model, latency)
+
+    # 解析翻译结果
+    content = completion.content
+    translated_batch = protocol.parse(content, batch)
+    for i, (source, translated) in enumerate(zip(batch, translated_batch)):
+        if translated is not None and not placeholders_intact(source, translated):
+            logging.warning(f"Placeholders lost in translation of {source!r}: {translated!r}")
+            translated_batch[i] = None
+    if metrics:
+        metrics.record_batch(len(batch), latency, completion.prompt_tokens, completion.completion_tokens,
+                             sum(t is None for t in translated_batch))
+
+    logging.debug(f"[中文] {len(batch)}: {batch}")
+    logging.debug(f"[英文] {sum(t is not None for t in translated_batch)}: {translated_batch}")
+    return translated_batch, content
+
+
+# 先用术语表在本地解析，再查翻译记忆和断点续传日志，返回 ({原文: 译文}, 术语表解析的条目数)
+# touch 为 False 时不刷新翻译记忆的使用时间（只做预估时）
+def lookup_known(text_list, prompt, use_memory=True, journal=None, glossary=None, touch=True):
+    remaining = set(text_list)
+    resolved = glossary.resolve_many(remaining) if glossary else {}
+    if resolved:
+        logging.info(f"Glossary resolved: {len(resolved)} / {len(text_list)}")
+        remaining.difference_update(resolved)
+    glossary_hits = sum(text in resolved for text in text_list)
+    hits = translation_memory.get_many(prompt, provider.model, remaining, touch=touch) if use_memory else {}
+    if hits:
+        logging.info(f"Translation memory hits: {len(hits)} / {len(text_list)}")
+    if journal and journal.completed:
+        resumed = journal.completed.keys() & remaining
+        logging.info(f"Resuming job: {len(resumed)} / {len(text_list)} already done")
+        hits.update((text, journal.completed[text]) for text in resumed)
+    hits.update(resolved)
+    return hits, glossary_hits
+
+
+# 批量翻译函数，按 token 预算自适应分批，最多 max_workers 个批次并发请求；batch_size 为每批条目数上限，默认由协议决定
+# 失败的条目会对半拆分重试，直到单条为止，总共最多额外请求 retry_budget 次；
+# 最终仍失败的文本保留原文，其下标追加到 failures 中；prompt 默认为 sys_prompt；metrics 为 RunMetrics，记录每个批次
+# journal 为 JobJournal 时，已记录的文本直接使用，每完成一个批次都写入日志；
+# 某个请求抛出异常时不再发送新批次，等在途批次完成并写入日志后再抛出，重新运行时从断点继续
+# glossary 为 Glossary，默认为 default_glossary；能被术语完整覆盖的文本在本地翻译，不经过翻译记忆和模型
+# 超过 CHUNK_TOKENS 的长文本按行和句子切分成块，块与其他文本一起查缓存、分批和并发请求，完成后按原顺序拼回，
+# 任一块失败的文本整体保留原文
+# URL、字段名、数字、格式化占位符、标签和行内代码在发送前替换为 {0}、{1} 等占位符，收到译文后换回；
+# 翻译记忆和断点续传日志中保存的也是替换后的文本
+def translate_text(text_list, batch_size=None, log_placeholder=None, max_workers=None, use_memory=True,
+                   retry_budget=None, failures=None, protocol=None, prompt=None, metrics=None, journal=None,
+                   glossary=None):
+    glossary = default_glossary if glossary is None else glossary
+    chunks = ChunkPlan(text_list)
+    if chunks.chunked:
+        logging.info(f"Split {len(chunks.chunked)} long texts: {len(text_list)} texts -> {len(chunks.units)} units")
+    # 能被术语表完整解析的文本不替换，保持术语和数字之间的空格规则
+    masks = MaskPlan(chunks.units, keep=glossary.resolve_many(chunks.units) if glossary else ())
+    failed_units = []
+    translated_units = _translate_units(masks.units, batch_size, log_placeholder, max_workers, use_memory,
+                                        retry_budget, failed_units, protocol, prompt, metrics, journal, glossary)
+    translated_units, failed_units = masks.restore(translated_units, failed_units)
+    translated_texts, failed = chunks.assemble(translated_units, failed_units)
+    if failures is not None:
+        failures.extend(failed)
+    return translated_texts
+
+
+def _translate_units(text_list, batch_size=None, log_placeholder=None, max_workers=None, use_memory=True,
+                     retry_budget=None, failures=None, protocol=None, prompt=None, metrics=None, journal=None,
+                     glossary=None):
+    prompt = prompt or sys_prompt
+    max_workers = max(1, max_workers or max_concurrency)
+    retry_budget = default_retry_budget if retry_budget is None else retry_budget
+    protocol = protocol or get_protocol()
+    glossary = default_glossary if glossary is None else glossary
+    translated_texts = list(text_list)
+
+    # 先用术语表在本地解析，再查翻译记忆，只有都未命中的文本才发送给模型
+    hits, glossary_hits = lookup_known(text_list, prompt, use_memory, journal, glossary)
+    pending = []
+    for i, text in enumerate(text_list):
+        if text in hits:
+            translated_texts[i] = hits[text]
+        else:
+            pending.append(i)
+    if metrics:
+        metrics.record_glossary_hits(glossary_hits)
+        metrics.record_memory_hits(len(text_list) - len(pending) - glossary_hits)
+
+    # 批次按需生成，每完成一个批次才取下一个，使分批器能根据刚观察到的失配率调整后续批次大小
+    batcher = get_batcher(provider.model, batch_size or protocol.max_items)
+    batches = batcher.iter_batches(text_list, pending)
+    retries = deque()  # 待重试的批次，优先于新批次发送
+    done = len(text_list) - len(pending)
+    calls = 0
+    failed = []
+    error = None
+
+    # 工作线程只负责请求，进度、告警和写缓存统一在当前（Streamlit 脚本）线程中进行；结果按原文下标回填
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = {}
+        while True:
+            while error is None and len(futures) < max_workers:
+                indices = retries.popleft() if retries else next(batches, None)
+                if indices is None:
+                    break
+                futures[executor.submit(translate_batch, [text_list[i] for i in indices], protocol, prompt,
+                                        metrics)] = indices
+                calls += 1
+            if not futures:
+                break
+
+            finished, _ = wait(futures, return_when=FIRST_COMPLETED)
+            for future in finished:
+                indices = futures.pop(future)
+                try:
+                    translated_batch, content = future.result()
+                except Exception as exc:
+                    # 保留第一个异常，其余在途批次照常处理
+                    if error is None:
+                        logging.error(f"Batch of {len(indices)} raised {exc!r}, stopping after in-flight batches")
+                        error = exc
+                    continue
+
+                # 成功的条目直接使用，只有失败的条目进入重试
+                succeeded = {text_list[i]: t for i, t in zip(indices, translated_batch) if t is not None}
+                for i, translated in zip(indices, translated_batch):
+                    if translated is not None:
+                        translated_texts[i] = translated
+                if use_memory:
+                    translation_memory.put_many(prompt, provider.model, succeeded)
+                if journal:
+                    journal.record(succeeded)
+                done += len(succeeded)
+
+                missing = [i for i, t in zip(indices, translated_batch) if t is None]
+                batcher.record(len(indices), bool(missing))
+                if len(missing) > 1 and retry_budget >= 2:
+                    # 对半拆分重试，只让真正有问题的条目保留原文
+                    logging.warning(f"Batch of {len(indices)}: {len(missing)} items failed, retrying in halves")
+                    mid = len(missing) // 2
+                    retries.extend((missing[:mid], missing[mid:]))
+                    retry_budget -= 2
+                    if metrics:
+                        metrics.record_retry(2)
+                elif len(missing) == 1 and len(indices) > 1 and retry_budget >= 1:
+                    # 大批次中个别条目缺失时单独重试
+                    retries.append(missing)
+                    retry_budget -= 1
+                    if metrics:
+                        metrics.record_retry()
+                elif missing:
+                    batch = [text_list[i] for i in missing]
+                    logging.warning(f"Batch of {len(indices)}: {len(missing)} items failed, kept untranslated")
+                    if log_placeholder:
+                        log_placeholder.warning(f"==========错误===============\n"
+                        f"[中文]: {len(batch)} \n{batch} \n "
+                        f"[英文]: \n{content} \n ")
+                    failed.extend(missing)
+                    done += len(missing)
+                    if metrics:
+                        metrics.record_failed(len(missing))
+
+                if log_placeholder:
+                    progress = f"翻译进度: {done} / {len(text_list)}"
+                    if metrics:
+                        progress += f"  \n{metrics.summary()}"
+                    log_placeholder.markdown(progress)
+
+    if error is not None:
+        raise error
+    if failures is not None:
+        failures.extend(sorted(failed))
+    logging.info(f"Translation requests: {calls} ({protocol.name}), failed items: {len(failed)}, "
+                 f"batch scale: {batcher.scale:.2f}, mismatch rate: {batcher.mismatch_rate:.1%}")
+    return translated_texts
+
+
+# 预估翻译 text_list 的开销，不请求模型：与 translate_text 一样先切分长文本、替换占位符，按相同的顺序查术语表、翻译记忆和断点续传日志，
+# 剩余文本按分批器当前的限制分批，估算请求数和 token 数；耗时按该模型最近的批次延迟中位数和并发数估算
+# texts 及各命中数按切分后的条目计
+def estimate_text(text_list, max_workers=None, use_memory=True, protocol=None, prompt=None, journal=None,
+                  glossary=None):
+    prompt = prompt or sys_prompt
+    max_workers = max(1, max_workers or max_concurrency)
+    protocol = protocol or get_protocol()
+    glossary = default_glossary if glossary is None else glossary
+    units = ChunkPlan(text_list).units
+    text_list = MaskPlan(units, keep=glossary.resolve_many(units) if glossary else ()).units
+
+    hits, glossary_hits = lookup_known(text_list, prompt, use_memory, journal, glossary, touch=False)
+    pending = [i for i, text in enumerate(text_list) if text not in hits]
+    # 每个请求的输入为提示词（含协议说明）加上批次内的文本，文本的 token 数在分批时已经估算过
+    plan = get_batcher(provider.model, protocol.max_items).plan(text_list, pending)
+    request_tokens = sum(estimate_tokens(message["content"]) for message in protocol.build_messages(prompt, []))
+    calls = len(plan)
+    prompt_tokens = calls * request_tokens + sum(input_tokens for _, input_tokens, _ in plan)
+    completion_tokens = sum(output_tokens for _, _, output_tokens in plan)
+
+    latencies = recent_latencies(provider.model)
+    batch_latency = statistics.median(latencies) if latencies else default_batch_latency
+    return {
+        "texts": len(text_list),
+        "glossary_hits": glossary_hits,
+        "cache_hits": len(text_list) - len(pending) - glossary_hits,
+        "pending": len(pending),
+        "hit_ratio": 1 - len(pending) / len(text_list) if text_list else 1.0,
+        "calls": calls,
+        "prompt_tokens": prompt_tokens,
+        "completion_tokens": completion_tokens,
+        "batch_latency": batch_latency,
+        "latency_samples": len(latencies),
+        "eta_seconds": math.ceil(calls / max_workers) * batch_latency,
+    }
+
+
+# 预估多种语言的开销：每种语言单独预估（并发数平均分配），合计请求数和 token 数；各语言并发执行，总耗时取最长的语言
+def estimate_languages(text_list, languages, max_workers=None, protocol=None, prompt=None, prompts=None,
+                       journals=None, glossary=None):
+    languages = list(dict.fromkeys(languages))
+    per_language = max(1, -(-(max_workers or max_concurrency) // len(languages)))
+    journals = journals or {}
+    estimates = {language: estimate_text(text_list, max_workers=per_language, protocol=protocol,
+                                         prompt=language_prompt(language, prompt, prompts),
+                                         journal=journals.get(language), glossary=language_glossary(language, glossary))
+                 for language in languages}
+    return {
+        "model": provider.model,
+        "protocol": (protocol or get_protocol()).name,
+        "calls": sum(e["calls"] for e in estimates.values()),
+        "prompt_tokens": sum(e["prompt_tokens"] for e in estimates.values()),
+        "completion_tokens": sum(e["completion_tokens"] for e in estimates.values()),
+        "eta_seconds": max(e["eta_seconds"] for e in estimates.values()),
+        "languages": estimates,
+    }
+
+
+# 预估结果的一行中文摘要
+def format_estimate(estimate):
+    texts = sum(e["texts"] for e in estimate["languages"].values())
+    hit_ratio = 1 - sum(e["pending"] for e in estimate["languages"].values()) / texts if texts else 1.0
+    return (f"预计请求 {estimate['calls']} 次，token 输入 {estimate['prompt_tokens']} / 输出 "
+            f"{estimate['completion_tokens']}，本地命中率 {hit_ratio:.0%}，预计耗时 {estimate['eta_seconds']:.0f}s")
+
+
+# 多语言任务中每种语言的进度区域：各语言的最新进度合并显示在同一个 placeholder 中
+class _LanguageLog:
+    def __init__(self, placeholder, language, messages, lock):
+        self.placeholder = placeholder
+        self.language = language
+        self._messages = messages
+        self._lock = lock
+
+    def markdown(self, text, **kwargs):
+        with self._lock:
+            self._messages[self.language] = text
+            self.placeholder.markdown("  \n".join(f"**{language}** {message}"
+                                                  for language, message in self._messages.items()), **kwargs)
+
+    def warning(self, text):
+        self.placeholder.warning(f"[{self.language}] {text}")
+
+
+# 把同一组文本并发翻译成多种语言，返回 {语言: (译文列表, 失败的下标列表)}
+# 每种语言的提示词见 language_prompt，翻译记忆按提示词区分；journals 为 {语言: JobJournal}
+# max_workers 为所有语言合计的并发请求数，平均分给各语言；某种语言抛出异常时等其他语言结束后再抛出
+def translate_languages(text_list, languages, log_placeholder=None, max_workers=None, protocol=None, prompt=None,
+                        prompts=None, metrics=None, journals=None, glossary=None):
+    languages = list(dict.fromkeys(languages))
+    per_language = max(1, -(-(max_workers or max_concurrency) // len(languages)))
+    journals = journals or {}
+    messages, lock = {}, threading.Lock()
+
+    def run(language):
+        failed = []
+        log = _LanguageLog(log_placeholder, language, messages, lock) if log_placeholder else None
+        translated = translate_text(text_list, log_placeholder=log, max_workers=per_language, failures=failed,
+                                    protocol=protocol, prompt=language_prompt(language, prompt, prompts),
+                                    metrics=metrics, journal=journals.get(language),
+                                    glossary=language_glossary(language, glossary))
+        return translated, failed
+
+    with ThreadPoolExecutor(max_workers=len(languages)) as executor:
+        futures = {language: executor.submit(run, language) for language in languages}
+    return {language: future.result() for language, future in futures.items()}
+
+
+# 迭代遍历 JSON（不受递归深度限制），一次性记录每个待翻译文本的位置 (父容器, 键或下标, 路径)
+# 根节点放在单元素列表中，返回 (root, locations)，翻译后的文档为 root[0]
+# rules 为 PathRules 时按包含/排除规则过滤，被排除或不可能被包含的子树不会被访问
+def collect_translations(data, rules=None):
+    if rules:
+        return _collect_with_rules(data, rules)
+    root = [data]
+    locations = []
+    # 路径用 (父路径, 键) 的嵌套元组表示，共享前缀，需要时再用 format_path 展开
+    stack = [(root, 0, None)]
+    while stack:
+        parent, key, path = stack.pop()
+        node = parent[key]
+        if isinstance(node, dict):
+            stack.extend((node, k, (path, k)) for k in reversed(list(node)))
+        elif isinstance(node, list):
+            stack.extend((node, i, (path, i)) for i in range(len(node) - 1, -1, -1))
+        elif isinstance(node, str):
+            if contains_cjk(node):
+                locations.append((parent, key, path))  # 收集中文文本进行批量翻译
+    return root, locations
+
+
+# 带规则的遍历：每个节点额外携带规则自动机的状态，进入子节点前先转移状态，返回 None 的子树直接剪掉
+def _collect_with_rules(data, rules):
+    root = [data]
+    locations = []
+    step = rules.step
+    stack = [(root, 0, None, rules.start())]
+    while stack:
+        parent, key, path, state = stack.pop()
+        node = parent[key]
+        if isinstance(node, dict):
+            for k in reversed(list(node)):
+                child_state = step(state, k)
+                if child_state is not None:
+                    stack.append((node, k, (path, k), child_state))
+        elif isinstance(node, list):
+            for i in range(len(node) - 1, -1, -1):
+                child_state = step(state, i)
+                if child_state is not None:
+                    stack.append((node, i, (path, i), child_state))
+        elif isinstance(node, str):
+            if rules.collects(state) and contains_cjk(node):
+                locations.append((parent, key, path))
+    return root, locations
+
+
+# 按收集到的位置直接写回译文，translation_map 为 {原文: 译文}，同一原文的所有出现位置都会被替换
+def apply_translations(locations, translation_map):
+    for parent, key, _ in locations:
+        parent[key] = translation_map.get(parent[key], parent[key])
+
+
+# 将路径展开为 JSONPath 形式，例如 $.paths[0].description
+def format_path(path):
+    keys = []
+    while path is not None:
+        path, key = path
+        keys.append(f"[{key}]" if isinstance(key, int) else f".{key}")
+    return "$" + "".join(reversed(keys))
+
+
+# 增量翻译：同时遍历上一版原文和它的译文，返回 {路径: (原文, 译文)}
+# 只记录含中文的原文；两边结构对不上的位置、以及译文与原文相同（上次未翻译成功）的位置不记录
+def collect_previous(old_source, old_translated):
+    previous = {}
+    stack = [(old_source, old_translated, None)]
+    while stack:
+        source, translated, path = stack.pop()
+        if isinstance(source, dict) and isinstance(translated, dict):
+            stack.extend((value, translated[k], (path, k)) for k, value in source.items() if k in translated)
+        elif isinstance(source, list) and isinstance(translated, list):
+            stack.extend((value, translated[i], (path, i)) for i, value in enumerate(source[:len(translated)]))
+        elif isinstance(source, str) and isinstance(translated, str):
+            if translated != source and contains_cjk(source):
+                previous[path] = (source, translated)
+    return previous
+
+
+# 按路径与上一版对比：路径和原文都没变的位置直接写回上一版的译文（保留对译文的人工修改）；
+# 新增或改动的位置如果原文在上一版其他位置出现过，也沿用其译文；返回仍需翻译的位置
+def reuse_previous(locations, previous, log_placeholder=None):
+    by_text = {source: translation for source, translation in previous.values()}
+    pending = []
+    unchanged = changed = added = 0
+    for location in locations:
+        parent, key, path = location
+        old = previous.get(path)
+        if old is None:
+            added += 1
+        elif old[0] == parent[key]:
+            unchanged += 1
+            parent[key] = old[1]
+            continue
+        else:
+            changed += 1
+        if parent[key] in by_text:
+            parent[key] = by_text[parent[key]]
+        else:
+            pending.append(location)
+
+    removed = len(previous) - unchanged - changed
+    logging.info(f"Diff against previous: {unchanged} unchanged, {changed} changed, {added} added, "
+                 f"{removed} removed; {len(pending)} / {len(locations)} need translation")
+    if log_placeholder:
+        log_placeholder.markdown(f"与上一版对比: 未变 {unchanged}，修改 {changed}，新增 {added}，删除 {removed}；"
+                                 f"需要翻译 {len(pending)} / {len(locations)}")
+    return pending
+
+
+# 去重：返回保持首次出现顺序的唯一文本列表，并记录去重比例
+def dedup_texts(texts, log_placeholder=None):
+    unique_texts = list(dict.fromkeys(texts))
+    ratio = 1 - len(unique_texts) / len(texts) if texts else 0.0
+    logging.info(f"Dedup: {len(texts)} -> {len(unique_texts)} unique ({ratio:.1%} removed)")
+    if log_placeholder:
+        log_placeholder.markdown(f"去重: {len(texts)} 条 -> {len(unique_texts)} 条（减少 {ratio:.1%}）")
+    return unique_texts
+
+
+# 读取JSON文件
+def load_json(json_file):
+    stringio = StringIO(json_file.getvalue().decode("utf-8"))
+    return json.load(stringio)
+
+
+# orjson 只支持紧凑和 2 空格缩进；不支持的缩进或 orjson 无法处理的数据（例如超出 64 位的整数）返回 None
+def _orjson_dumps(data, indent):
+    if orjson is None or indent not in (None, 2):
+        return None
+    try:
+        return orjson.dumps(data, option=orjson.OPT_INDENT_2 if indent else 0)
+    except TypeError:
+        return None
+
+
+# 把翻译后的数据序列化为 UTF-8 字节，indent 为 None 时输出紧凑格式；安装了 orjson 时优先使用
+def serialize_json(data, indent=4):
+    content = _orjson_dumps(data, indent)
+    if content is None:
+        separators = (",", ":") if indent is None else None
+        content = json.dumps(data, ensure_ascii=False, indent=indent, separators=separators).encode("utf-8")
+    return content
+
+
+# 把翻译后的数据直接写入文件，只序列化一次；标准库分块写出，不在内存中生成完整的字符串
+def write_json(data, path, indent=4):
+    content = _orjson_dumps(data, indent)
+    if content is not None:
+        with open(path, "wb") as f:
+            f.write(content)
+        return
+    separators = (",", ":") if indent is None else None
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False, indent=indent, separators=separators)
+
+
+# 翻译已加载的 JSON 数据，返回翻译后的数据（原数据会被修改）
+# 翻译失败的条目以 {"path": JSON 路径, "source": 原文} 的形式追加到 failures 中；metrics 记录 collect/translate/replace 阶段耗时
+# previous 为 collect_previous 的结果，传入时只翻译相对上一版新增或改动的文本；journal、glossary 见 translate_text
+# rules 为 PathRules，只翻译规则允许的路径下的文本
+def translate_data(data, log_placeholder=None, max_workers=None, failures=None, protocol=None, prompt=None,
+                   metrics=None, previous=None, journal=None, glossary=None, rules=None):
+    metrics = metrics or RunMetrics()
+
+    # 收集所有需要翻译的文本及其位置
+    with metrics.stage("collect"):
+        root, locations = collect_translations(data, rules)
+    if previous:
+        with metrics.stage("diff"):
+            locations = reuse_previous(locations, previous, log_placeholder)
+    translations = [parent[key] for parent, key, _ in locations]
+
+    # 批量翻译：相同的文本只翻译一次
+    if translations:
+        with metrics.stage("dedup"):
+            unique_texts = dedup_texts(translations, log_placeholder)
+        failed = []
+        with metrics.stage("translate"):
+            translated_texts = translate_text(unique_texts, log_placeholder=log_placeholder, max_workers=max_workers,
+                                              failures=failed, protocol=protocol, prompt=prompt, metrics=metrics,
+                                              journal=journal, glossary=glossary)
+
+        if log_placeholder:
+            log_placeholder.markdown(f"已翻译的条目: {len(translations)}（去重后 {len(unique_texts)}）",
+                                     unsafe_allow_html=True)
+        logging.info(f"Translated Entries: {len(translations)} ({len(unique_texts)} unique)")
+
+        with metrics.stage("replace"):
+            # 把失败的原文展开到它出现的每个位置
+            report_failures(locations, {unique_texts[i] for i in failed}, failures)
+
+            # 按位置写回翻译内容
+            apply_translations(locations, dict(zip(unique_texts, translated_texts)))
+    return root[0]
+
+
+# 多语言版本的 translate_data：收集和去重只做一次，各语言并发翻译；
+# 之后依次把每种语言的译文写回同一棵树，调用 emit(语言, 文档) 输出，再恢复原文，不为每种语言复制整棵树
+# failures 中的每一项带有 language 字段
+def translate_data_languages(data, languages, emit, log_placeholder=None, max_workers=None, failures=None,
+                             protocol=None, prompt=None, prompts=None, metrics=None, journals=None, glossary=None,
+                             rules=None):
+    metrics = metrics or RunMetrics()
+    languages = list(dict.fromkeys(languages))
+
+    with metrics.stage("collect"):
+        root, locations = collect_translations(data, rules)
+    sources = [parent[key] for parent, key, _ in locations]
+
+    unique_texts, results = [], {}
+    if sources:
+        with metrics.stage("dedup"):
+            unique_texts = dedup_texts(sources, log_placeholder)
+        with metrics.stage("translate"):
+            results = translate_languages(unique_texts, languages, log_placeholder, max_workers=max_workers,
+                                          protocol=protocol, prompt=prompt, prompts=prompts, metrics=metrics,
+                                          journals=journals, glossary=glossary)
+        logging.info(f"Translated Entries: {len(sources)} ({len(unique_texts)} unique) x {len(languages)} languages")
+
+    for language in languages:
+        translated_texts, failed = results.get(language, ([], []))
+        with metrics.stage("replace"):
+            language_failures = []
+            report_failures(locations, {unique_texts[i] for i in failed}, language_failures)
+            if failures is not None:
+                failures.extend(dict(failure, language=language) for failure in language_failures)
+            apply_translations(locations, dict(zip(unique_texts, translated_texts)))
+        emit(language, root[0])
+        for (parent, key, _), source in zip(locations, sources):
+            parent[key] = source
+
+
+# 记录未翻译的条目及其 JSON 路径
+def report_failures(locations, failed_texts, failures=None):
+    if not failed_texts:
+        return
+    for parent, key, path in locations:
+        if parent[key] in failed_texts:
+            logging.warning(f"Untranslated at {format_path(path)}: {parent[key]}")
+            if failures is not None:
+                failures.append({"path": format_path(path), "source": parent[key]})
+
+
+# 打开文件对应的断点续传日志；已有未完成的记录时提示将从断点继续
+def open_journal(json_file, prompt, log_placeholder=None):
+    journal = JobJournal.for_job(job_id(file_digest(json_file), prompt or sys_prompt, provider.model))
+    if journal.completed:
+        logging.info(f"Found journal {journal.path} with {len(journal.completed)} completed texts")
+        if log_placeholder:
+            log_placeholder.markdown(f"从断点继续：已完成 {len(journal.completed)} 条")
+    return journal
+
+
+# 主函数：加载原始 JSON -> 翻译 -> 返回翻译后的文件；传入 metrics 可在结束后取得运行报告
+# previous_files 为 (上一版原文, 上一版译文) 两个文件，传入时进行增量翻译
+# resume 为 True 时每完成一个批次都写入断点续传日志，任务中断后重新提交同一文件即从断点继续，成功结束后删除日志
+# 给出 output_path 时结果写入该文件并返回路径，否则返回序列化后的字节；indent 为 None 时输出紧凑格式
+# languages 为目标语言列表（默认只有英文），多于一种时见 _translate_and_save_languages；prompts 为 {语言: 提示词}
+# dry_run 为 True 时不翻译也不写出，返回 estimate_json 的预估结果
+def translate_and_save_json(json_file, log_placeholder, max_workers=None, failures=None, protocol=None, prompt=None,
+                            metrics=None, previous_files=None, resume=True, glossary=None, output_path=None, indent=4,
+                            rules=None, languages=None, prompts=None, dry_run=False):
+    if dry_run:
+        return estimate_json(json_file, log_placeholder, max_workers=max_workers, protocol=protocol, prompt=prompt,
+                             previous_files=previous_files, resume=resume, glossary=glossary, rules=rules,
+                             languages=languages, prompts=prompts)
+    languages = list(dict.fromkeys(languages or ["en"]))
+    if len(languages) > 1:
+        if previous_files:
+            raise ValueError("Incremental translation supports a single target language")
+        return _translate_and_save_languages(json_file, log_placeholder, languages, max_workers=max_workers,
+                                             failures=failures, protocol=protocol, prompt=prompt, prompts=prompts,
+                                             metrics=metrics, resume=resume, glossary=glossary,
+                                             output_path=output_path, indent=indent, rules=rules)
+    prompt = language_prompt(languages[0], prompt, prompts)
+    glossary = language_glossary(languages[0], glossary)
+
+    metrics = metrics or RunMetrics()
+    journal = open_journal(json_file, prompt, log_placeholder) if resume else None
+
+    try:
+        # 加载原始 JSON 文件
+        with metrics.stage("load"):
+            original_data = load_json(json_file)
+            previous = collect_previous(*map(load_json, previous_files)) if previous_files else None
+
+        translated_data = translate_data(original_data, log_placeholder, max_workers=max_workers, failures=failures,
+                                         protocol=protocol, prompt=prompt, metrics=metrics, previous=previous,
+                                         journal=journal, glossary=glossary, rules=rules)
+
+        # 只序列化一次：写入文件，或直接返回字节
+        with metrics.stage("serialize"):
+            if output_path:
+                write_json(translated_data, output_path, indent)
+                result = output_path
+            else:
+                result = serialize_json(translated_data, indent)
+    finally:
+        if journal:
+            journal.close()
+    if journal:
+        journal.finish()
+    return result
+
+
+# 预估翻译一个文件的开销而不请求模型：收集、增量对比、去重后按各目标语言查缓存并分批，见 estimate_languages
+# 结果另外包含文件中的条目数 strings 和去重后的条目数 unique；断点续传日志只读取，不创建
+def estimate_json(json_file, log_placeholder=None, max_workers=None, protocol=None, prompt=None, previous_files=None,
+                  resume=True, glossary=None, rules=None, languages=None, prompts=None):
+    languages = list(dict.fromkeys(languages or ["en"]))
+    _, locations = collect_translations(load_json(json_file), rules)
+    if previous_files:
+        locations = reuse_previous(locations, collect_previous(*map(load_json, previous_files)))
+    texts = [parent[key] for parent, key, _ in locations]
+    unique_texts = list(dict.fromkeys(texts))
+
+    journals = {}
+    if resume:
+        digest = file_digest(json_file)
+        journals = {language: JobJournal.for_job(job_id(digest, language_prompt(language, prompt, prompts),
+                                                        provider.model))
+                    for language in languages}
+    estimate = estimate_languages(unique_texts, languages, max_workers=max_workers, protocol=protocol, prompt=prompt,
+                                  prompts=prompts, journals=journals, glossary=glossary)
+    estimate.update(strings=len(texts), unique=len(unique_texts))
+    if log_placeholder:
+        log_placeholder.markdown(format_estimate(estimate))
+    logging.info(format_estimate(estimate))
+    return estimate
+
+
+# 一次任务翻译成多种语言，每种语言一个输出：
+# output_path 以 .zip 结尾时写成一个压缩包（每种语言一个 <语言>.json），其他 output_path 视为目录，写入 <目录>/<语言>.json；
+# 两种情况都返回 output_path；不给 output_path 时返回 {语言: 序列化后的字节}
+# 每种语言有各自的断点续传日志，某种语言失败后重新提交时已完成的语言直接从日志恢复
+def _translate_and_save_languages(json_file, log_placeholder, languages, max_workers=None, failures=None,
+                                  protocol=None, prompt=None, prompts=None, metrics=None, resume=True, glossary=None,
+                                  output_path=None, indent=4, rules=None):
+    metrics = metrics or RunMetrics()
+    journals = {}
+    if resume:
+        journals = {language: open_journal(json_file, language_prompt(language, prompt, prompts))
+                    for language in languages}
+
+    results = {}
+    archive = None
+    if output_path and output_path.endswith(".zip"):
+        archive = zipfile.ZipFile(output_path, "w", zipfile.ZIP_DEFLATED)
+    elif output_path:
+        os.makedirs(output_path, exist_ok=True)
+
+    def emit(language, document):
+        with metrics.stage("serialize"):
+            if archive:
+                archive.writestr(f"{language}.json", serialize_json(document, indent))
+            elif output_path:
+                write_json(document, os.path.join(output_path, f"{language}.json"), indent)
+            else:
+                results[language] = serialize_json(document, indent)
+
+    try:
+        with metrics.stage("load"):
+            original_data = load_json(json_file)
+        translate_data_languages(original_data, languages, emit, log_placeholder, max_workers=max_workers,
+                                 failures=failures, protocol=protocol, prompt=prompt, prompts=prompts,
+                                 metrics=metrics, journals=journals, glossary=glossary, rules=rules)
+    finally:
+        if archive:
+            archive.close()
+        for journal in journals.values():
+            journal.close()
+    for journal in journals.values():
+        journal.finish()
+    return output_path if output_path else results
+
+
+# 流式模式：边读边翻译边写入 output_path，适合超大文件，返回输出文件路径
+# 传入 failures 列表时追加未翻译的条目 {"path": None, "source": 原文}；流式模式不跟踪 JSON 路径
+def translate_and_save_json_streaming(json_file, log_placeholder, max_workers=None, output_path="output.json",
+                                      protocol=None, prompt=None, metrics=None, resume=True, glossary=None,
+                                      failures=None):
+    metrics = metrics or RunMetrics()
+    journal = open_journal(json_file, prompt, log_placeholder) if resume else None
+    # 上传的文件按 UTF-8 增量解码；用完后 detach，避免关闭 Streamlit 持有的原始文件对象
+    reader = io.TextIOWrapper(json_file, encoding="utf-8")
+    try:
+        # 流式模式下读取、解析和写出交织进行，整体记为 stream 阶段，其中的模型请求另记为 translate 阶段
+        def translate_window(texts):
+            failed = []
+            with metrics.stage("translate"):
+                translated = translate_text(texts, log_placeholder=log_placeholder, max_workers=max_workers,
+                                            failures=failed, protocol=protocol, prompt=prompt, metrics=metrics,
+                                            journal=journal, glossary=glossary)
+            if failures is not None:
+                failures.extend({"path": None, "source": texts[i]} for i in failed)
+            return translated
+
+        with metrics.stage("stream"), open(output_path, 'w', encoding='utf-8') as writer:
+            count = stream_translate(reader, writer, translate_window)
+    finally:
+        reader.detach()
+        if journal:
+            journal.close()
+    if journal:
+        journal.finish()
+
+    if log_placeholder:
+        log_placeholder.markdown(f"已翻译的条目: {count}", unsafe_allow_html=True)
+    logging.info(f"Translated Entries (streaming): {count}")
+    return output_path